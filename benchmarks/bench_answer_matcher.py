@@ -0,0 +1,108 @@
+"""Microbenchmark: precompiled ResponseMatcher vs the old per-turn substring loop.
+
+Usage:
+    python -m benchmarks.bench_answer_matcher [--repeat 20000]
+"""
+import argparse
+import glob
+import timeit
+import yaml
+
+from server.services.answer_matcher import ResponseMatcher
+
+SAMPLE_INPUTS = [
+    "Bence cevap çekirdek",
+    "bilmiyorum",
+    "GÜNEŞ'İN MERKEZİNDE FÜZYON OLUR",
+    "print('Merhaba Dünya!') yazarız",
+    "5 + 3 = 8",
+    "hiçbir fikrim yok, biraz daha ipucu verir misin?",
+    # Türkçe ekli cevaplar
+    "çekirdekte",
+    "hidrojenin helyuma dönüşmesi",
+    "atmosferi yok",
+    # Kısa kelime ve yapım eki içeren, kabul edilmemesi gereken cevaplar
+    "şu an bilmiyorum",
+    "surat",
+    "enerji sıcak değil mi",
+    "sekizinci",
+    "printer",
+]
+
+# (beklenen cevaplar, kullanıcı girdisi, eşleşmeli mi)
+CASES = [
+    (["çekirdek", "merkez"], "çekirdekte", True),
+    (["füzyon", "hidrojen", "helyum"], "hidrojenin helyuma dönüşmesi", True),
+    (["atmosfer", "koruma"], "atmosferi yok", True),
+    (["en sıcak", "462"], "en sıcağı", True),
+    (["8", "sekiz"], "5 + 3 = 8", True),
+    (["yaşam", "su", "atmosfer"], "şu an bilmiyorum", False),
+    (["yaşam", "su", "atmosfer"], "şunu bilmiyorum", False),
+    (["yaşam", "su", "atmosfer"], "surat", False),
+    (["en sıcak", "462"], "enerji sıcak değil mi", False),
+    (["8", "sekiz"], "sekizinci", False),
+    (["print", "print()"], "printer", False),
+]
+
+
+def legacy_match(expected_responses, user_input):
+    return any(expected.lower() in user_input.lower() for expected in expected_responses)
+
+
+def load_expected_responses(pattern="courses/*.yaml"):
+    responses = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "r", encoding="utf-8") as file:
+            data = yaml.safe_load(file)
+        for section in data.get("course_sections", []):
+            for step in section.get("steps", []):
+                if step.get("expected_responses"):
+                    responses.append(step["expected_responses"])
+    return responses
+
+
+def run(repeat: int):
+    step_responses = load_expected_responses()
+    # Uzun cevap listelerini de ölç
+    step_responses.append([f"cevap{i}" for i in range(200)] + ["çekirdek"])
+    matchers = [ResponseMatcher(expected) for expected in step_responses]
+
+    def legacy():
+        for expected in step_responses:
+            for user_input in SAMPLE_INPUTS:
+                legacy_match(expected, user_input)
+
+    def compiled():
+        for matcher in matchers:
+            for user_input in SAMPLE_INPUTS:
+                matcher.matches(user_input)
+
+    checks = len(step_responses) * len(SAMPLE_INPUTS)
+    for name, fn in (("legacy substring loop", legacy), ("compiled matcher", compiled)):
+        seconds = min(timeit.repeat(fn, number=max(1, repeat // checks), repeat=3))
+        per_check = seconds / (max(1, repeat // checks) * checks) * 1e6
+        print(f"{name:24s} {per_check:8.2f} us/check")
+
+    disagreements = [
+        (expected[0], user_input)
+        for expected, matcher in zip(step_responses, matchers)
+        for user_input in SAMPLE_INPUTS
+        if legacy_match(expected, user_input) != matcher.matches(user_input)
+    ]
+    # Ekli cevaplar ve alt dize eşleşmeleri nedeniyle fark beklenir
+    print(f"{len(disagreements)} of {checks} checks differ from the legacy loop")
+
+    failures = [
+        (expected, user_input)
+        for expected, user_input, should_match in CASES
+        if ResponseMatcher(expected).matches(user_input) != should_match
+    ]
+    print(f"{len(CASES) - len(failures)} of {len(CASES)} expected outcomes hold")
+    for expected, user_input in failures:
+        print(f"  unexpected result: {expected!r} vs {user_input!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20000)
+    run(parser.parse_args().repeat)
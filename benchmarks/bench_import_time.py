@@ -0,0 +1,92 @@
+"""Import-time profile of the API: per-module cost of `import server.main`.
+
+Runs the import in fresh interpreters with `-X importtime` and reports the
+slowest modules (self and cumulative time), the cost per top-level package
+and the wall time of a cold import, median over --runs.
+
+Usage:
+    python -m benchmarks.bench_import_time [--module server.main] [--top 25] [--runs 5]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def profile_once(module: str):
+    env = {**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "x")}
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise SystemExit(result.stderr[-2000:])
+
+    modules = {}  # name -> (self_us, cumulative_us, depth)
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="server.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    walls, samples = [], defaultdict(list)
+    for _ in range(args.runs):
+        wall, modules = profile_once(args.module)
+        walls.append(wall)
+        for name, values in modules.items():
+            samples[name].append(values)
+
+    # Her modül için çalıştırmalar arası medyan
+    modules = {
+        name: (
+            statistics.median(v[0] for v in values),
+            statistics.median(v[1] for v in values),
+            values[0][2],
+        )
+        for name, values in samples.items()
+    }
+    total_self = sum(v[0] for v in modules.values())
+
+    print(f"import {args.module}: wall p50={statistics.median(walls) * 1000:.0f}ms "
+          f"(interpreter included), imports={total_self / 1000:.0f}ms, modules={len(modules)}")
+
+    packages = defaultdict(float)
+    for name, (self_us, _, _) in modules.items():
+        packages[name.split(".")[0]] += self_us
+    print("\nby top-level package (self time):")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {package:32s} {self_us / 1000:8.1f}ms  {100 * self_us / total_self:5.1f}%")
+
+    print("\nslowest modules (cumulative, imported directly by the project):")
+    direct = [
+        (name, values) for name, values in modules.items()
+        if name.startswith("server") or values[2] == 1
+    ]
+    for name, (self_us, cumulative_us, _) in sorted(direct, key=lambda item: -item[1][1])[: args.top]:
+        print(f"  {name:48s} self={self_us / 1000:7.1f}ms  cumulative={cumulative_us / 1000:7.1f}ms")
+
+    heavy = [name for name in ("langchain", "langchain_core", "langchain_google_genai", "motor", "pymongo") if name in packages]
+    print(f"\nheavy packages imported eagerly: {', '.join(heavy) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Per-call overhead: lean prompt | model | parser chain vs the AgentExecutor.
+
+Both paths call the fake LLM with zero latency, so the measured time is
+pure LangChain overhead: building the per-request runnable (memory and
+executor for the agent path) and invoking it with a realistic history.
+
+Usage:
+    python -m benchmarks.bench_llm_chain [--calls 300] [--history 20] [--verbose]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--history", type=int, default=20, help="messages of chat history per call")
+    parser.add_argument("--course", default="solar_system")
+    parser.add_argument("--verbose", action="store_true", help="agent path with verbose=True (old default)")
+    return parser.parse_args()
+
+
+async def measure(calls, make_call):
+    await make_call()  # ısınma: import ve şablon önbellekleri
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await make_call()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+async def run(args):
+    # Ayarlar server modülleri import edilmeden önce belirlenmeli
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = "0"
+    os.environ["FAKE_LLM_TOKENS_PER_SECOND"] = "0"
+    os.environ["LLM_VERBOSE"] = "true" if args.verbose else "false"
+
+    from server.models.course import CourseCursor
+    from server.services.course_loader import load_course_content
+    from server.services.langchain.chat import build_agent_executor, initialize_chat
+
+    course = load_course_content(args.course)
+    cursor = CourseCursor(course_id=args.course, course=course, section_index=0, step_index=1)
+    history = [
+        {"role": "user" if i % 2 else "assistant", "content": f"Mesaj {i}: güneş, çekirdek ve füzyon hakkında."}
+        for i in range(args.history)
+    ]
+    inputs = {"input": "Güneşin merkezinde ne olur?"}
+
+    async def lean_call():
+        await initialize_chat("bench", history, cursor).ainvoke(inputs)
+
+    async def agent_call():
+        await build_agent_executor("bench", history, cursor).ainvoke(inputs)
+
+    results = {
+        "chain": await measure(args.calls, lean_call),
+        "agent_executor": await measure(args.calls, agent_call),
+    }
+
+    print(f"calls={args.calls} history={args.history} course={args.course} verbose_agent={args.verbose}")
+    for name, samples in results.items():
+        print(
+            f"  {name:15s} mean={statistics.mean(samples):8.0f}µs  p50={statistics.median(samples):8.0f}µs  "
+            f"p95={sorted(samples)[int(0.95 * len(samples)) - 1]:8.0f}µs"
+        )
+    saved = statistics.mean(results["agent_executor"]) - statistics.mean(results["chain"])
+    print(f"  overhead removed per call: {saved:.0f}µs "
+          f"({statistics.mean(results['agent_executor']) / statistics.mean(results['chain']):.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
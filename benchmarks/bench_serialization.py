@@ -0,0 +1,85 @@
+"""Serialization throughput: FastAPI's generic path vs the orjson/BSON path.
+
+Compares, in MB/s of JSON produced:
+  - a large chat history document (ObjectId, datetimes, N messages) through
+    jsonable_encoder + JSONResponse vs ORJSONResponse;
+  - course content through course.dict() + JSONResponse vs precomputed bytes
+    (what the course-content endpoint serves after the first request);
+  - Message.dict(): pydantic path vs the fast path.
+
+Usage:
+    python -m benchmarks.bench_serialization [--messages 500] [--repeat 200]
+"""
+import argparse
+import timeit
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from server.models.chat import Message
+from server.services.course_loader import list_course_ids, load_course_content
+from server.services.serialization import ORJSONResponse, dumps
+
+
+def history_document(messages: int) -> dict:
+    started = datetime(2024, 11, 3, 12, 0, 0)
+    return {
+        "_id": ObjectId(),
+        "user_id": "bench_user",
+        "updated_at": started + timedelta(minutes=messages),
+        "messages": [
+            {
+                "role": "user" if i % 2 else "assistant",
+                "content": f"Mesaj {i}: Güneş'in çekirdeğinde füzyon gerçekleşir ve enerji açığa çıkar. " * 3,
+                "timestamp": (started + timedelta(seconds=30 * i)).isoformat(),
+            }
+            for i in range(messages)
+        ],
+    }
+
+
+def throughput(label: str, fn, repeat: int, size: int):
+    seconds = min(timeit.repeat(fn, number=repeat, repeat=3)) / repeat
+    print(f"  {label:34s} {seconds * 1e6:9.1f}µs/call  {size / seconds / 1e6:8.1f} MB/s")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    document = history_document(args.messages)
+    size = len(dumps(document))
+    print(f"history document: {args.messages} messages, {size / 1024:.0f} KiB")
+    legacy = throughput("jsonable_encoder + JSONResponse", lambda: JSONResponse(jsonable_encoder(
+        document, custom_encoder={ObjectId: str})).body, args.repeat, size)
+    fast = throughput("ORJSONResponse", lambda: ORJSONResponse(document).body, args.repeat, size)
+    print(f"  speedup: {legacy / fast:.1f}x")
+
+    courses = {course_id: load_course_content(course_id) for course_id in list_course_ids()}
+    precomputed = {course_id: dumps(course.dict()) for course_id, course in courses.items()}
+    size = sum(len(body) for body in precomputed.values())
+    print(f"\ncourse content: {len(courses)} courses, {size / 1024:.1f} KiB")
+    legacy = throughput("course.dict() + JSONResponse", lambda: [
+        JSONResponse(jsonable_encoder(course.dict())).body for course in courses.values()
+    ], args.repeat, size)
+    fast = throughput("precomputed bytes", lambda: [
+        precomputed[course_id] for course_id in courses
+    ], args.repeat, size)
+    print(f"  speedup: {legacy / fast:.0f}x")
+
+    message = Message(role="user", content="Güneşin merkezinde füzyon olur.")
+    print("\nMessage.dict()")
+    legacy = throughput("pydantic dict + isoformat", lambda: {
+        **BaseModel.model_dump(message), "timestamp": message.timestamp.isoformat()
+    }, args.repeat * 50, len(dumps(message.dict())))
+    fast = throughput("fast path", message.dict, args.repeat * 50, len(dumps(message.dict())))
+    print(f"  speedup: {legacy / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Count MongoDB round trips per tutor turn against a local mongod.
+
+Walks every course in courses/*.yaml with scripted (expected) answers, so
+no LLM call is made, and reports Mongo commands per turn.
+
+Usage:
+    MONGODB_URI=mongodb://localhost:27017 DATABASE_NAME=bench \\
+        python -m benchmarks.bench_turn_roundtrips
+"""
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from server.database import command_counter
+from server.main import app
+from server.services.course_loader import list_course_ids, load_course_content
+
+
+def scripted_answers(course):
+    """The inputs a student would type to walk the course without the LLM."""
+    answers = ["evet"]
+    for section in course.sections:
+        for step in section.steps:
+            if step.expected_responses:
+                answers.append(step.expected_responses[0])
+    return answers
+
+
+async def run():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for course_id in list_course_ids():
+            course = load_course_content(course_id)
+            user_id = f"bench_{course_id}"
+
+            command_counter.reset()
+            response = await client.post(f"/llm/start-course/{course_id}", params={"user_id": user_id})
+            response.raise_for_status()
+            start_ops = command_counter.total
+
+            ops, latencies = [], []
+            for answer in scripted_answers(course):
+                command_counter.reset()
+                started = time.perf_counter()
+                response = await client.post(
+                    "/llm/completions", json={"input": answer}, params={"user_id": user_id}
+                )
+                latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+                ops.append(command_counter.total)
+
+            print(
+                f"{course_id:20s} start-course={start_ops} ops  "
+                f"turns={len(ops)}  mongo ops/turn mean={statistics.mean(ops):.2f} max={max(ops)}  "
+                f"latency p50={statistics.median(latencies):.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
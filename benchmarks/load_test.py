@@ -0,0 +1,137 @@
+"""Offline load test: simulated students walk full courses through the API.
+
+Each virtual student starts a course, answers "evet", then answers every
+step from courses/*.yaml; a share of answers is deliberately wrong or
+off-script. All course starts run first, so the Mongo ops report is per
+completions request. The LLM is the deterministic fake backend, so no
+network is needed beyond a local mongod.
+
+Usage:
+    MONGODB_URI=mongodb://localhost:27017 DATABASE_NAME=bench \\
+        python -m benchmarks.load_test --students 50 --concurrency 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from collections import defaultdict
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=20, help="virtual students in total")
+    parser.add_argument("--concurrency", type=int, default=5, help="students active at once")
+    parser.add_argument("--courses", nargs="*", help="course ids (default: all)")
+    parser.add_argument("--wrong-ratio", type=float, default=0.2, help="share of wrong/off-script answers")
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--stream", action="store_true", help="use /llm/completions/stream")
+    parser.add_argument("--base-url", help="hit a running server instead of the in-process app")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def student_script(course, rng, wrong_ratio):
+    """Inputs for one walk through the course; wrong answers repeat the step."""
+    inputs = ["evet"]
+    for section in course.sections:
+        for step in section.steps:
+            if not step.expected_responses:
+                inputs.append("bunu biraz daha açıklar mısın?")
+                continue
+            while rng.random() < wrong_ratio:
+                inputs.append(rng.choice(["bilmiyorum", "anlamadım", "emin değilim"]))
+            inputs.append(rng.choice(step.expected_responses))
+    return inputs
+
+
+async def run(args):
+    # Ayarlar server modülleri import edilmeden önce belirlenmeli
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_LLM_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+
+    import httpx
+    from server.database import command_counter
+    from server.main import app
+    from server.services.course_loader import list_course_ids, load_course_content
+
+    rng = random.Random(args.seed)
+    course_ids = args.courses or list_course_ids()
+    courses = {course_id: load_course_content(course_id) for course_id in course_ids}
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    completions_path = "/llm/completions/stream" if args.stream else "/llm/completions"
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def timed(name, method, url, **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        latencies[name].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400 or "event: error" in response.text:
+            errors[f"{name} {response.status_code}"] += 1
+
+    students = [
+        (f"bench_{index}", course_ids[index % len(course_ids)], random.Random(rng.random()))
+        for index in range(args.students)
+    ]
+
+    async def start(user_id, course_id):
+        async with semaphore:
+            await timed("start-course", "POST", f"/llm/start-course/{course_id}", params={"user_id": user_id})
+
+    async def student(user_id, course_id, student_rng):
+        inputs = student_script(courses[course_id], student_rng, args.wrong_ratio)
+        async with semaphore:
+            for text in inputs:
+                await timed("completions", "POST", completions_path, json={"input": text}, params={"user_id": user_id})
+
+    # Kurs başlatma ayrı bir aşamada çalışır; Mongo işlemleri tur başına ayrı sayılır
+    started = time.perf_counter()
+    async with client:
+        command_counter.reset()
+        await asyncio.gather(*(start(user_id, course_id) for user_id, course_id, _ in students))
+        start_ops = command_counter.total
+        command_counter.reset()
+        await asyncio.gather(*(student(*entry) for entry in students))
+    elapsed = time.perf_counter() - started
+
+    requests = sum(len(values) for values in latencies.values())
+    turns = len(latencies["completions"])
+    print(f"students={args.students} concurrency={args.concurrency} courses={','.join(course_ids)} stream={args.stream}")
+    print(f"{requests} requests in {elapsed:.2f}s -> {requests / elapsed:.1f} req/s, {turns / elapsed:.1f} turns/s")
+    for name, values in latencies.items():
+        print(
+            f"  {name:14s} n={len(values):5d}  p50={percentile(values, 50):7.1f}ms  "
+            f"p95={percentile(values, 95):7.1f}ms  p99={percentile(values, 99):7.1f}ms  "
+            f"mean={statistics.mean(values):7.1f}ms"
+        )
+    if not args.base_url and turns:
+        starts = len(latencies["start-course"])
+        print(
+            f"  mongo ops/completion={command_counter.total / turns:.2f}  "
+            f"ops/start-course={start_ops / max(starts, 1):.2f}  "
+            f"completion ops by command: {dict(command_counter.commands)}"
+        )
+    if errors:
+        print(f"  errors: {dict(errors)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
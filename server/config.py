@@ -7,8 +7,68 @@ class Settings:
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "db")
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY")
+    # "gemini" veya çevrimdışı test/benchmark için "fake"
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "gemini")
+    FAKE_LLM_LATENCY_MS: float = float(os.getenv("FAKE_LLM_LATENCY_MS", "200"))
+    FAKE_LLM_TOKENS_PER_SECOND: float = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50"))
+    # true: LangChain ve model istemcisi açılışta yüklenir; false: ilk LLM turunda
+    LLM_WARMUP: bool = os.getenv("LLM_WARMUP", "false").lower() == "true"
+    # LangChain verbose callback'leri (sadece geliştirmede açın)
+    LLM_VERBOSE: bool = os.getenv("LLM_VERBOSE", "false").lower() == "true"
+    # LLM kabul kontrolü: eşzamanlılık, kuyruk sınırı ve bekleme süresi
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_MAX_QUEUE: int = int(os.getenv("LLM_MAX_QUEUE", "64"))
+    LLM_QUEUE_DEADLINE_SECONDS: float = float(os.getenv("LLM_QUEUE_DEADLINE_SECONDS", "10"))
+    LLM_SHORT_INPUT_CHARS: int = int(os.getenv("LLM_SHORT_INPUT_CHARS", "40"))
+    LLM_RETRY_AFTER_SECONDS: int = int(os.getenv("LLM_RETRY_AFTER_SECONDS", "5"))
     CHAT_COLLECTION: str = "chat_history"
     USER_COLLECTION: str = "users"
+    # Kullanıcı listeleme sayfa boyutu ve toplu içe aktarma parti boyutu
+    USER_PAGE_MAX_LIMIT: int = int(os.getenv("USER_PAGE_MAX_LIMIT", "1000"))
+    USER_BULK_BATCH_SIZE: int = int(os.getenv("USER_BULK_BATCH_SIZE", "1000"))
+    COURSE_COLLECTION: str = "courses"
+    # Açılışta indeksleri oluştur; teşhis modunda sıcak sorguların planlarını doğrula
+    MONGO_ENSURE_INDEXES: bool = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+    MONGO_EXPLAIN_QUERIES: bool = os.getenv("MONGO_EXPLAIN_QUERIES", "false").lower() == "true"
+    # Durum ve geçmiş yazımlarını tek transaction'da yap (replica set gerektirir)
+    MONGO_TRANSACTIONS: bool = os.getenv("MONGO_TRANSACTIONS", "false").lower() == "true"
+    # Tur yazımlarını arabelleğe alıp toplu (bulk_write) yaz; MONGO_TRANSACTIONS'tan önceliklidir
+    MONGO_WRITE_BEHIND: bool = os.getenv("MONGO_WRITE_BEHIND", "false").lower() == "true"
+    WRITE_BEHIND_MAX_BATCH: int = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "200"))
+    WRITE_BEHIND_FLUSH_MS: float = float(os.getenv("WRITE_BEHIND_FLUSH_MS", "50"))
+    WRITE_BEHIND_MAX_BACKOFF_SECONDS: float = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF_SECONDS", "5"))
+    # Serbest sohbet yanıt önbelleği (LRU + TTL, isteğe bağlı Mongo katmanı)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_SIZE: int = int(os.getenv("LLM_CACHE_MAX_SIZE", "2000"))
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+    LLM_CACHE_MONGO: bool = os.getenv("LLM_CACHE_MONGO", "false").lower() == "true"
+    LLM_CACHE_COLLECTION: str = "llm_response_cache"
+    # Yerel vektör indeksi: önceki ilgili adımları prompta ekler
+    VECTOR_INDEX_ENABLED: bool = os.getenv("VECTOR_INDEX_ENABLED", "true").lower() == "true"
+    VECTOR_INDEX_DIR: str = os.getenv("VECTOR_INDEX_DIR", "data/vector_index")
+    VECTOR_EMBEDDER: str = os.getenv("VECTOR_EMBEDDER", "hashing")  # veya "modul:fabrika"
+    VECTOR_DIMENSION: int = int(os.getenv("VECTOR_DIMENSION", "512"))
+    VECTOR_TOP_K: int = int(os.getenv("VECTOR_TOP_K", "2"))
+    VECTOR_MIN_SCORE: float = float(os.getenv("VECTOR_MIN_SCORE", "0.1"))
+    COURSES_DIR: str = os.getenv("COURSES_DIR", "courses")
+    # Derlenmiş kurs kataloğu ve YAML değişikliklerinde sıcak yeniden yükleme
+    COURSE_CATALOG_PATH: str = os.getenv("COURSE_CATALOG_PATH", "data/course_catalog.msgpack")
+    COURSE_CATALOG_WATCH: bool = os.getenv("COURSE_CATALOG_WATCH", "true").lower() == "true"
+    COURSE_CATALOG_POLL_SECONDS: float = float(os.getenv("COURSE_CATALOG_POLL_SECONDS", "2"))
+    # Kullanıcı başına saklanan en fazla mesaj ve her turda okunan son mesaj sayısı
+    CHAT_HISTORY_MAX_MESSAGES: int = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "500"))
+    CHAT_CONTEXT_MESSAGES: int = int(os.getenv("CHAT_CONTEXT_MESSAGES", "20"))
+    # WebSocket sohbet oturumları: bellekte tutulan tur bağlamı ve boşta kalma süresi
+    CHAT_SESSION_IDLE_SECONDS: float = float(os.getenv("CHAT_SESSION_IDLE_SECONDS", "300"))
+    CHAT_SESSION_SWEEP_SECONDS: float = float(os.getenv("CHAT_SESSION_SWEEP_SECONDS", "30"))
+    CHAT_SESSION_MAX: int = int(os.getenv("CHAT_SESSION_MAX", "10000"))
+    # LLM'e gönderilen istem için token bütçesi (sistem + geçmiş + girdi)
+    LLM_PROMPT_TOKEN_BUDGET: int = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "3000"))
+    LLM_TOKEN_CACHE_SIZE: int = int(os.getenv("LLM_TOKEN_CACHE_SIZE", "8192"))
+    # HTTP önbellekleme ve sıkıştırma (kurs içeriği, katalog ve /images)
+    HTTP_CACHE_MAX_AGE: int = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))
+    STATIC_CACHE_MAX_AGE: int = int(os.getenv("STATIC_CACHE_MAX_AGE", "86400"))
+    HTTP_COMPRESS_MIN_BYTES: int = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "1024"))
     
 
 settings = Settings()
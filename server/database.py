@@ -1,5 +1,88 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from collections import Counter
 from .config import settings
 
-client = AsyncIOMotorClient(settings.MONGODB_URI)
-db = client[settings.DATABASE_NAME]
\ No newline at end of file
+
+class CommandCounter:
+    """Counts MongoDB commands (round trips) sent by this process."""
+
+    def __init__(self):
+        self.commands = Counter()
+
+    @property
+    def total(self) -> int:
+        return sum(self.commands.values())
+
+    def reset(self):
+        self.commands.clear()
+
+    def started(self, event):
+        self.commands[event.command_name] += 1
+
+
+command_counter = CommandCounter()
+
+# Motor istemcisi import anında değil, lifespan'de (veya ilk kullanımda) kurulur
+client = None
+db = None
+
+
+def _build_listener(counter: CommandCounter):
+    from pymongo import monitoring
+
+    class _CommandListener(monitoring.CommandListener):
+        def started(self, event):
+            counter.started(event)
+
+        def succeeded(self, event):
+            pass
+
+        def failed(self, event):
+            pass
+
+    return _CommandListener()
+
+
+def connect():
+    """Create the Motor client; called from the app lifespan."""
+    global client, db
+    if client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(settings.MONGODB_URI, event_listeners=[_build_listener(command_counter)])
+        db = client[settings.DATABASE_NAME]
+    return db
+
+
+def close():
+    global client, db
+    if client is not None:
+        client.close()
+    client = None
+    db = None
+
+
+def get_client():
+    connect()
+    return client
+
+
+def get_db():
+    return connect()
+
+
+class LazyCollection:
+    """Module-level collection handle that resolves against the current client."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._resolved = (None, None)  # (db, collection)
+
+    def __getattr__(self, attribute):
+        current_db = get_db()
+        if self._resolved[0] is not current_db:
+            self._resolved = (current_db, current_db.get_collection(self.name))
+        return getattr(self._resolved[1], attribute)
+
+
+def collection(name: str) -> LazyCollection:
+    return LazyCollection(name)
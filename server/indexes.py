@@ -0,0 +1,98 @@
+"""Index bootstrap and query-plan checks for the hot MongoDB queries.
+
+Run against a local mongod with:
+    python -m server.indexes [--explain]
+"""
+import argparse
+import asyncio
+import logging
+from pymongo import ASCENDING, IndexModel
+from server.config import settings
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_INDEXES = {
+    settings.COURSE_COLLECTION: [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="user_id_unique"),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    settings.CHAT_COLLECTION: [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="user_id_unique"),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    settings.USER_COLLECTION: [
+        IndexModel([("email", ASCENDING)], name="email"),
+    ],
+}
+
+if settings.LLM_CACHE_MONGO:
+    # Süresi dolan paylaşılan önbellek kayıtları Mongo tarafından silinir
+    REQUIRED_INDEXES[settings.LLM_CACHE_COLLECTION] = [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ]
+
+# Her turda çalışan sorgular: (koleksiyon, filtre)
+HOT_QUERIES = [
+    (settings.COURSE_COLLECTION, {"user_id": "__explain__"}),
+    (settings.CHAT_COLLECTION, {"user_id": "__explain__"}),
+    (settings.USER_COLLECTION, {"email": "__explain__"}),
+]
+
+
+class CollectionScanError(RuntimeError):
+    pass
+
+
+async def ensure_indexes(db):
+    """Create the indexes the request path relies on (no-op when they exist)."""
+    for collection_name, indexes in REQUIRED_INDEXES.items():
+        names = await db[collection_name].create_indexes(indexes)
+        logger.info(f"Indexes ensured on {collection_name}: {names}")
+
+
+def find_stages(plan: dict) -> list:
+    """Collect every stage name in an explain plan tree."""
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(find_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(find_stages(child))
+    return [stage for stage in stages if stage]
+
+
+async def check_query_plans(db):
+    """Explain the hot queries and raise CollectionScanError on any COLLSCAN."""
+    scans = []
+    for collection_name, query_filter in HOT_QUERIES:
+        explain = await db.command(
+            {"explain": {"find": collection_name, "filter": query_filter}, "verbosity": "queryPlanner"}
+        )
+        stages = find_stages(explain["queryPlanner"]["winningPlan"])
+        logger.info(f"Query plan for {collection_name} {query_filter}: {stages}")
+        if "COLLSCAN" in stages:
+            scans.append(f"{collection_name} {query_filter}")
+
+    if scans:
+        raise CollectionScanError(f"Collection scan on hot queries: {', '.join(scans)}")
+
+
+async def _main(explain: bool):
+    from server import database
+
+    # İstemci import anında kurulmaz; komut satırında açıkça bağlanılır
+    db = database.connect()
+    try:
+        await ensure_indexes(db)
+        if explain:
+            await check_query_plans(db)
+    finally:
+        database.close()
+    print("OK")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--explain", action="store_true", help="fail on COLLSCAN in hot queries")
+    asyncio.run(_main(parser.parse_args().explain))
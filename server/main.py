@@ -1,10 +1,68 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+import logging
+import time
+from server import database
+from server.config import settings
+from server.services.chat_sessions import chat_sessions
+from server.services.course_catalog import get_catalog, start_watcher, stop_watcher
+from server.services.course_loader import get_course_cache_stats
+from server.services.http_cache import CachedStaticFiles, get_http_cache_stats
+from server.services.langchain.response_cache import response_cache
+from server.services.langchain.scheduler import llm_scheduler
+from server.services.langchain.singleflight import llm_singleflight
+from server.services.langchain.vector_stores.local import vector_store
+from server.services.metrics import TimingMiddleware, register_stats
+from server.services.serialization import ORJSONResponse
+from server.services.write_behind import write_behind
 from server.routers import user, llm
 
-app = FastAPI(title="NeYapAI API")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Ağ bağlantılı istemciler import anında değil burada kurulur
+    db = database.connect()
+    if settings.MONGO_ENSURE_INDEXES or settings.MONGO_EXPLAIN_QUERIES:
+        from server.indexes import ensure_indexes, check_query_plans
+
+        if settings.MONGO_ENSURE_INDEXES:
+            await ensure_indexes(db)
+        if settings.MONGO_EXPLAIN_QUERIES:
+            # COLLSCAN varsa uygulama açılmaz
+            await check_query_plans(db)
+
+    catalog = get_catalog()
+    logger.info(f"Course catalog: {len(catalog.entries)} courses, {len(catalog.invalid)} invalid")
+    if settings.COURSE_CATALOG_WATCH:
+        start_watcher()
+
+    if settings.VECTOR_INDEX_ENABLED:
+        # Sadece değişen kurslar yeniden gömülür
+        logger.info(f"Vector index: {vector_store.sync()}")
+
+    if settings.LLM_WARMUP:
+        # LangChain ve model istemcisi ilk LLM turunu beklemeden yüklenir
+        from server.services.langchain.chat import warm_up
+
+        warm_up()
+    logger.info(f"Startup finished in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    yield
+
+    stop_watcher()
+    await chat_sessions.stop()
+    # Arabellekte kalan tur yazımları kapanmadan önce yazılır
+    await write_behind.stop()
+    database.close()
+
+
+app = FastAPI(title="NeYapAI API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Set up CORS
 app.add_middleware(
@@ -13,14 +71,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag"],
 )
+app.add_middleware(TimingMiddleware)
+
+register_stats("course_cache", get_course_cache_stats)
+register_stats("http_cache", get_http_cache_stats)
+register_stats("llm_response_cache", response_cache.get_stats)
+register_stats("llm_singleflight", llm_singleflight.get_stats)
+register_stats("llm_scheduler", llm_scheduler.get_stats)
+register_stats("write_behind", write_behind.get_stats)
+register_stats("chat_sessions", chat_sessions.get_stats)
 
 # Include routers
 app.include_router(user.router)
 app.include_router(llm.router)
 
-# Statik dosyaları mount et
-app.mount("/images", StaticFiles(directory=Path(__file__).parent.parent / "images"), name="images")
+# Statik dosyaları mount et (ETag/304 + Cache-Control)
+app.mount("/images", CachedStaticFiles(directory=Path(__file__).parent.parent / "images"), name="images")
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 
 @app.get("/")
 async def root():
@@ -9,6 +9,9 @@ class Message(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     
     def dict(self, *args, **kwargs):
+        if not args and not kwargs:
+            # Sık kullanılan yol: pydantic serileştirmesini atla
+            return {"role": self.role, "content": self.content, "timestamp": self.timestamp.isoformat()}
         d = super().dict(*args, **kwargs)
         d["timestamp"] = self.timestamp.isoformat()
         return d
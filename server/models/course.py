@@ -1,5 +1,7 @@
-from pydantic import BaseModel
+from dataclasses import dataclass
+from pydantic import BaseModel, PrivateAttr
 from typing import List, Optional
+from server.services.answer_matcher import ResponseMatcher
 
 class Step(BaseModel):
     step: int
@@ -7,6 +9,20 @@ class Step(BaseModel):
     expected_responses: Optional[List[str]] = None
     next_action: str  # "CONTINUE", "NEXT", "FINISH"
 
+    _matcher: Optional[ResponseMatcher] = PrivateAttr(default=None)
+
+    class Config:
+        frozen = True
+
+    def compile_matcher(self) -> ResponseMatcher:
+        """Compile expected_responses into a matcher once, at course load."""
+        if self._matcher is None:
+            self._matcher = ResponseMatcher(self.expected_responses or [])
+        return self._matcher
+
+    def matches(self, user_input: str) -> bool:
+        return self.compile_matcher().matches(user_input)
+
 class CourseSection(BaseModel):
     title: str
     content: str = ""
@@ -14,8 +30,142 @@ class CourseSection(BaseModel):
     steps: List[Step]
     current_step: int = 0
 
+    class Config:
+        frozen = True
+
 class Course(BaseModel):
     title: str
     description: str
     sections: List[CourseSection]
-    current_section: int = 0 
\ No newline at end of file
+    current_section: int = 0
+    llm_cache: bool = True  # YAML'da "llm_cache: false" ile kapatılır
+
+    _step_index: Optional["StepIndex"] = PrivateAttr(default=None)
+
+    class Config:
+        frozen = True
+
+    @property
+    def step_index(self) -> "StepIndex":
+        """Flat step index, built once at course load."""
+        if self._step_index is None:
+            self._step_index = StepIndex(self)
+        return self._step_index
+
+
+@dataclass(frozen=True)
+class StepEntry:
+    ordinal: int  # kurs genelinde 0'dan başlayan sıra
+    section_index: int
+    step_index: int
+    next_ordinal: Optional[int]  # FINISH veya kursun sonu için None
+
+
+class StepIndex:
+    """Course steps flattened into one list with global ordinals.
+
+    Gives O(1) lookups from (section, step) to ordinal and back, cumulative
+    step counts per section and next-step pointers from next_action.
+    """
+
+    def __init__(self, course: Course):
+        self.section_titles = [section.title for section in course.sections]
+        self.section_sizes = [len(section.steps) for section in course.sections]
+        self.section_starts = []
+
+        positions = []  # (section_index, step_index, next_action)
+        for section_index, section in enumerate(course.sections):
+            self.section_starts.append(len(positions))
+            for step_index, step in enumerate(section.steps):
+                positions.append((section_index, step_index, step.next_action))
+
+        total = len(positions)
+        self.entries = [
+            StepEntry(
+                ordinal=ordinal,
+                section_index=section_index,
+                step_index=step_index,
+                next_ordinal=None if next_action == "FINISH" or ordinal + 1 >= total else ordinal + 1,
+            )
+            for ordinal, (section_index, step_index, next_action) in enumerate(positions)
+        ]
+        self._progress_cache = {}
+
+    @property
+    def total_steps(self) -> int:
+        return len(self.entries)
+
+    def ordinal(self, section_index: int, step_index: int) -> int:
+        return self.section_starts[section_index] + step_index
+
+    def next_entry(self, section_index: int, step_index: int) -> Optional[StepEntry]:
+        """The step that follows (section, step); None when the course ends there."""
+        next_ordinal = self.entries[self.ordinal(section_index, step_index)].next_ordinal
+        return None if next_ordinal is None else self.entries[next_ordinal]
+
+    def locate(self, section_index: int, step_index: int) -> tuple:
+        """Clamp a stored (section, step) pair to a valid position.
+
+        A step past the end of its section moves to the first step of the
+        next section (or stays in the last section); -1 is the "not started
+        yet" step and is kept as is.
+        """
+        section_index = min(section_index, len(self.section_sizes) - 1)
+        if step_index >= self.section_sizes[section_index]:
+            start = self.section_starts[section_index] + self.section_sizes[section_index]
+            if start < self.total_steps:
+                entry = self.entries[start]
+                return entry.section_index, entry.step_index
+            return section_index, 0
+        return section_index, step_index
+
+    def progress(self, section_index: int, step_index: int, completed: bool = False) -> dict:
+        """Compact progress payload; memoized per position."""
+        key = (section_index, step_index, completed)
+        cached = self._progress_cache.get(key)
+        if cached is not None:
+            return cached
+
+        started = step_index >= 0
+        if started:
+            section_index, step_index = self.locate(section_index, step_index)
+        done_steps = self.total_steps if completed else (self.ordinal(section_index, step_index) if started else 0)
+
+        sections = []
+        for index, (title, size) in enumerate(zip(self.section_titles, self.section_sizes)):
+            if completed or (started and index < section_index):
+                status = "done"
+            elif started and index == section_index:
+                status = "current"
+            else:
+                status = "pending"
+            sections.append({"title": title, "steps": size, "status": status})
+
+        payload = {
+            "started": started,
+            "completed": completed,
+            "current_section": section_index,
+            "current_step": step_index,
+            "total_steps": self.total_steps,
+            "percent_complete": round(100 * done_steps / self.total_steps, 1) if self.total_steps else 0.0,
+            "sections": sections,
+        }
+        self._progress_cache[key] = payload
+        return payload
+
+
+@dataclass(frozen=True)
+class CourseCursor:
+    """Per-request position inside a shared, immutable Course."""
+    course_id: str
+    course: Course
+    section_index: int = 0
+    step_index: int = 0
+
+    @property
+    def section(self) -> CourseSection:
+        return self.course.sections[self.section_index]
+
+    @property
+    def step(self) -> Step:
+        return self.section.steps[self.step_index]
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, validator
+from typing import List, Optional
 from bson import ObjectId
 
 class PyObjectId(ObjectId):
@@ -14,11 +14,21 @@ class PyObjectId(ObjectId):
         return ObjectId(v)
 
 class User(BaseModel):
-    id: Optional[str] = Field(alias="_id")
+    id: Optional[str] = Field(alias="_id", default=None)
     name: str
     email: EmailStr
     age: Optional[int] = None
 
+    # Mongo'dan gelen ObjectId _id'ler metin olarak döner
+    @validator("id", pre=True)
+    def object_id_to_str(cls, value):
+        return str(value) if isinstance(value, ObjectId) else value
+
     class Config:
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
+
+
+class UserPage(BaseModel):
+    users: List[User]
+    next_cursor: Optional[str] = None
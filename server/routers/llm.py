@@ -1,31 +1,42 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from server.models.llm import LLMRequest, LLMResponse
 from server.models.chat import Message, ChatHistory
-from server.models.course import Course
+from server.models.course import Course, CourseCursor
 from server.services.langchain.chat import initialize_chat
-from server.services.course_loader import load_course_content
-from server.database import db
-from datetime import datetime
+from server.services.langchain.response_cache import response_cache
+from server.services.langchain.scheduler import LLMOverloaded, is_rate_limit_error, llm_scheduler
+from server.services.langchain.singleflight import llm_singleflight
+from server.services.chat_sessions import ChatSession, chat_sessions
+from server.services.course_loader import get_course_hash, load_course_content, list_courses
+from server.services.http_cache import cached_json_response, make_etag
+from server.services.metrics import request_timing, set_labels, span
+from server.services.serialization import ORJSONResponse
+from server.services.write_behind import StaleWrite, write_behind
+from server.config import settings
+from server import database
+from datetime import datetime, timezone
+from typing import Optional
+import asyncio
+import json
 import logging
-import os
 
 router = APIRouter(prefix="/llm", tags=["LLM"])
 
 logger = logging.getLogger(__name__)
-chat_collection = db.get_collection("chat_history")
-course_collection = db.get_collection("courses")
+chat_collection = database.collection(settings.CHAT_COLLECTION)
+course_collection = database.collection(settings.COURSE_COLLECTION)
 
 
 @router.post("/start-course/{course_id}")
 async def start_course(course_id: str, user_id: str = "default_user"):
+    set_labels(endpoint="start-course", path="scripted")
     try:
         # Load course content
-        course = load_course_content(course_id)
-
-        # Initialize chat with course context
-        agent_executor = initialize_chat(
-            conversation_id=user_id, chat_history=[], course=course
-        )
+        with span("course_load"):
+            course = load_course_content(course_id)
+        # Etiket yalnızca var olan kurslar için; bilinmeyen id'ler yeni seri açmaz
+        set_labels(course=course_id)
 
         # Create welcome message
         welcome_message = Message(
@@ -33,31 +44,37 @@ async def start_course(course_id: str, user_id: str = "default_user"):
             content=f"Merhaba! {course.title} dersine hoş geldin! Başlamaya hazır mısın? (Evet/Hayır)",
         )
 
-        # Store course state in database with special initial step
-        await course_collection.update_one(
-            {"user_id": user_id},
-            {
-                "$set": {
-                    "course_id": course_id,
-                    "current_section": 0,
-                    "current_step": -1,  # Özel başlangıç adımı
-                    "updated_at": datetime.utcnow(),
-                }
-            },
-            upsert=True,
-        )
-
-        # Clear and initialize chat history
-        await chat_collection.update_one(
-            {"user_id": user_id},
-            {
-                "$set": {
-                    "messages": [welcome_message.dict()],
-                    "updated_at": datetime.utcnow(),
-                }
-            },
-            upsert=True,
-        )
+        # Store course state with special initial step, and clear chat history
+        with span("mongo_write"):
+            # Bekleyen tur yazımları sıfırlamadan önce uygulanmalı
+            await write_behind.flush_user(user_id)
+            chat_sessions.invalidate(user_id)
+            await asyncio.gather(
+                course_collection.update_one(
+                    {"user_id": user_id},
+                    {
+                        "$set": {
+                            "course_id": course_id,
+                            "current_section": 0,
+                            "current_step": -1,  # Özel başlangıç adımı
+                            "updated_at": datetime.utcnow(),
+                        },
+                        "$unset": {"completed": "", "completed_at": ""},
+                        "$inc": {"version": 1},
+                    },
+                    upsert=True,
+                ),
+                chat_collection.update_one(
+                    {"user_id": user_id},
+                    {
+                        "$set": {
+                            "messages": [welcome_message.dict()],
+                            "updated_at": datetime.utcnow(),
+                        }
+                    },
+                    upsert=True,
+                ),
+            )
 
         return {"message": welcome_message.dict()}
     except Exception as e:
@@ -67,12 +84,15 @@ async def start_course(course_id: str, user_id: str = "default_user"):
 
 @router.post("/completions", response_model=LLMResponse)
 async def llm_completions(request: LLMRequest, user_id: str = "default_user"):
+    received_at = datetime.utcnow()
+    set_labels(endpoint="completions")
     try:
         # Debug için
         logger.info(f"Request: {request.dict()}")
         logger.info(f"User ID: {user_id}")
         
-        course_state, chat_history = await fetch_user_data(user_id)
+        with span("mongo_read"):
+            course_state, chat_history = await fetch_user_data(user_id)
         if not course_state:
             raise HTTPException(status_code=400, detail="No active course found")
 
@@ -80,66 +100,351 @@ async def llm_completions(request: LLMRequest, user_id: str = "default_user"):
         logger.info(f"Course State: {course_state}")
         logger.info(f"Chat History: {chat_history}")
 
-        course, current_section_obj, current_step_obj = load_course_details(course_state)
+        with span("course_load"):
+            cursor = load_course_details(course_state)
+        set_labels(course=cursor.course_id)
         
         # Debug için
-        logger.info(f"Current Section: {current_section_obj}")
-        logger.info(f"Current Step: {current_step_obj}")
+        logger.info(f"Current Section: {cursor.section}")
+        logger.info(f"Current Step: {cursor.step}")
         
         messages_list = prepare_chat_history(chat_history)
-        agent_executor = initialize_chat(conversation_id=user_id, chat_history=messages_list, course=course)
+        agent_executor = initialize_chat(conversation_id=user_id, chat_history=messages_list, cursor=cursor)
         
         user_input = request.input.lower()
-        llm_output = await process_user_input(
+        llm_output, state_update = await process_user_input(
             user_input,
-            current_step_obj,
-            current_section_obj,
+            cursor,
             course_state,
             agent_executor,
             user_id,
         )
         
-        await update_chat_history(user_id, request.input, llm_output)
+        with span("mongo_write"):
+            await commit_turn(user_id, course_state, state_update, request.input, llm_output, received_at)
         return LLMResponse(output=llm_output)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in llm_completions endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/completions/stream")
+async def llm_completions_stream(request: LLMRequest, user_id: str = "default_user"):
+    """
+    Stream the tutor reply as Server-Sent Events.
+
+    Events: `token` ({"token": str}) one or more times, then `done`
+    ({"output": str}) or `error` ({"detail": str}). Scripted and cached
+    replies arrive as a single token event.
+    """
+    received_at = datetime.utcnow()
+    set_labels(endpoint="completions-stream")
+    try:
+        with span("mongo_read"):
+            course_state, chat_history = await fetch_user_data(user_id)
+        if not course_state:
+            raise HTTPException(status_code=400, detail="No active course found")
+
+        with span("course_load"):
+            cursor = load_course_details(course_state)
+        set_labels(course=cursor.course_id)
+        messages_list = prepare_chat_history(chat_history)
+        agent_executor = initialize_chat(conversation_id=user_id, chat_history=messages_list, cursor=cursor)
+
+        user_input = request.input.lower()
+        with span("scripted"):
+            scripted_reply, state_update = process_scripted_input(user_input, cursor, course_state)
+        set_labels(path="scripted")
+
+        cache_key = None
+        if scripted_reply is None and response_cache.is_enabled_for(cursor):
+            cache_key = response_cache.make_key(cursor, user_input)
+            with span("llm_cache"):
+                scripted_reply = await response_cache.get(cache_key)
+            set_labels(path="cache")
+
+        if scripted_reply is None:
+            # Kuyruk doluysa akışı başlatmadan hemen 503 dön
+            llm_scheduler.check_admission()
+            priority = llm_scheduler.priority_for(user_input, first_turn=len(messages_list) <= 1)
+    except HTTPException:
+        raise
+    except LLMOverloaded as e:
+        raise overloaded_error(e)
+    except Exception as e:
+        logger.error(f"Error in llm_completions_stream endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream():
+        try:
+            if scripted_reply is not None:
+                output = scripted_reply
+                yield format_sse("token", {"token": output})
+            else:
+                set_labels(path="llm")
+                context_prompt = create_context_prompt(cursor.step, user_input)
+                chunks = []
+                with span("llm"):
+                    async with llm_scheduler.slot(user_id, priority):
+                        async for token in agent_executor.astream_tokens({"input": context_prompt}):
+                            chunks.append(token)
+                            yield format_sse("token", {"token": token})
+                output = "".join(chunks)
+                if cache_key:
+                    await response_cache.set(cache_key, output)
+
+            # Durum ve geçmiş, yanıtın tamamı gönderildikten sonra yazılır
+            with span("mongo_write"):
+                await commit_turn(user_id, course_state, state_update, request.input, output, received_at)
+            yield format_sse("done", {"output": output})
+        except HTTPException as e:
+            yield format_sse("error", {"detail": e.detail})
+        except LLMOverloaded as e:
+            yield format_sse("error", {"detail": overloaded_error(e).detail, "retry_after": e.retry_after})
+        except Exception as e:
+            logger.error(f"Error while streaming completion: {str(e)}")
+            if is_rate_limit_error(e):
+                overloaded = LLMOverloaded(settings.LLM_RETRY_AFTER_SECONDS, "upstream_rate_limited")
+                yield format_sse("error", {"detail": overloaded_error(overloaded).detail, "retry_after": overloaded.retry_after})
+            else:
+                yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode one Server-Sent Event; JSON keeps newlines inside `data`."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.websocket("/ws/{user_id}")
+async def llm_chat_socket(websocket: WebSocket, user_id: str):
+    """
+    Chat over a WebSocket that keeps the turn context in memory.
+
+    The client sends {"input": str} per turn. The server answers with
+    {"event": "token", "token": str} messages, then {"event": "done",
+    "output": str} or {"event": "error", "detail": str}. The user's course
+    state, cursor and recent history are loaded once and reused across
+    turns; turn writes go through the write-behind buffer.
+    """
+    await websocket.accept()
+    chat_sessions.connected(user_id)
+    try:
+        while True:
+            text = await websocket.receive_text()
+            with request_timing():
+                set_labels(endpoint="ws")
+                await socket_turn(websocket, user_id, text)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_sessions.disconnected(user_id)
+
+
+async def load_chat_session(user_id):
+    """Build a ChatSession from Mongo; None if the user has no active course."""
+    course_state, chat_history = await fetch_user_data(user_id)
+    if not course_state:
+        return None
+    return ChatSession(user_id, course_state, prepare_chat_history(chat_history), load_course_details(course_state))
+
+
+async def socket_turn(websocket: WebSocket, user_id: str, text: str):
+    """Answer one WebSocket turn from the in-memory session."""
+    received_at = datetime.utcnow()
+    try:
+        request = LLMRequest.parse_raw(text)
+    except Exception:
+        await websocket.send_json({"event": "error", "detail": "Geçersiz istek: {\"input\": \"...\"} bekleniyor"})
+        return
+
+    try:
+        with span("session"):
+            session = await chat_sessions.acquire(user_id, load_chat_session)
+        if session is None:
+            raise HTTPException(status_code=400, detail="No active course found")
+
+        async with session.lock:
+            # Katalog yeniden yüklendiyse imleç yeni kurs nesnesine taşınır
+            if load_course_content(session.course_state["course_id"]) is not session.cursor.course:
+                session.cursor = load_course_details(session.course_state)
+            cursor, course_state = session.cursor, session.course_state
+            set_labels(course=cursor.course_id)
+
+            user_input = request.input.lower()
+            with span("scripted"):
+                output, state_update = process_scripted_input(user_input, cursor, course_state)
+            set_labels(path="scripted")
+
+            cache_key = None
+            if output is None and response_cache.is_enabled_for(cursor):
+                cache_key = response_cache.make_key(cursor, user_input)
+                with span("llm_cache"):
+                    output = await response_cache.get(cache_key)
+                set_labels(path="cache")
+
+            if output is None:
+                set_labels(path="llm")
+                llm_scheduler.check_admission()
+                chat = initialize_chat(conversation_id=user_id, chat_history=session.history, cursor=cursor)
+                priority = llm_scheduler.priority_for(user_input, first_turn=len(session.history) <= 1)
+                context_prompt = create_context_prompt(cursor.step, user_input)
+                chunks = []
+                with span("llm"):
+                    async with llm_scheduler.slot(user_id, priority):
+                        async for token in chat.astream_tokens({"input": context_prompt}):
+                            chunks.append(token)
+                            await websocket.send_json({"event": "token", "token": token})
+                output = "".join(chunks)
+                if cache_key:
+                    await response_cache.set(cache_key, output)
+            else:
+                await websocket.send_json({"event": "token", "token": output})
+
+            # Yazım arabelleğe alınır; bellek içi durum hemen ilerler
+            with span("persist"):
+                queue_turn(user_id, course_state, state_update, request.input, output, received_at)
+                session.record_turn(request.input, output, state_update)
+                if state_update:
+                    session.cursor = load_course_details(session.course_state)
+        await websocket.send_json({"event": "done", "output": output})
+    except WebSocketDisconnect:
+        raise
+    except HTTPException as e:
+        if e.status_code == 409:
+            chat_sessions.invalidate(user_id)
+        await websocket.send_json({"event": "error", "detail": e.detail})
+    except LLMOverloaded as e:
+        await websocket.send_json(
+            {"event": "error", "detail": overloaded_error(e).detail, "retry_after": e.retry_after}
+        )
+    except Exception as e:
+        logger.error(f"Error in WebSocket turn: {str(e)}")
+        # Yarım kalan tur sonrası durum Mongo'dan yeniden okunur
+        chat_sessions.invalidate(user_id)
+        if is_rate_limit_error(e):
+            overloaded = LLMOverloaded(settings.LLM_RETRY_AFTER_SECONDS, "upstream_rate_limited")
+            await websocket.send_json(
+                {"event": "error", "detail": overloaded_error(overloaded).detail, "retry_after": overloaded.retry_after}
+            )
+        else:
+            await websocket.send_json({"event": "error", "detail": str(e)})
+
+
 async def fetch_user_data(user_id):
-    """Fetch user's course state and chat history."""
-    course_state = await course_collection.find_one({"user_id": user_id})
-    chat_history = await chat_collection.find_one({"user_id": user_id})
+    """Fetch user's course state and the most recent chat messages concurrently."""
+    await write_behind.flush_user(user_id)
+    course_state, chat_history = await asyncio.gather(
+        course_collection.find_one({"user_id": user_id}),
+        chat_collection.find_one(
+            {"user_id": user_id},
+            {"_id": 0, "messages": {"$slice": -settings.CHAT_CONTEXT_MESSAGES}},
+        ),
+    )
     return course_state, chat_history
 
 
+async def commit_turn(user_id, course_state, state_update, user_input, assistant_response, received_at=None):
+    """Persist the turn: guarded course-state advance plus chat history.
+
+    The course-state update only applies if the user is still on the step the
+    turn was evaluated against, so a double-submitted answer cannot advance
+    twice. With MONGO_TRANSACTIONS both writes share one transaction; with
+    MONGO_WRITE_BEHIND they are queued and flushed in batches instead.
+    """
+    # WebSocket oturumundaki bellek içi durum artık eski
+    chat_sessions.invalidate(user_id)
+    if settings.MONGO_WRITE_BEHIND:
+        queue_turn(user_id, course_state, state_update, user_input, assistant_response, received_at)
+        return
+
+    if not state_update:
+        await update_chat_history(user_id, user_input, assistant_response, received_at)
+        return
+
+    guard = {
+        "user_id": user_id,
+        "current_section": course_state["current_section"],
+        "current_step": course_state["current_step"],
+    }
+    update = {
+        "$set": {**state_update, "updated_at": datetime.utcnow()},
+        "$inc": {"version": 1},
+    }
+
+    if settings.MONGO_TRANSACTIONS:
+        async with await database.get_client().start_session() as session:
+            async with session.start_transaction():
+                advanced = await course_collection.find_one_and_update(guard, update, session=session)
+                if advanced is None:
+                    raise stale_turn_error()
+                await update_chat_history(
+                    user_id, user_input, assistant_response, received_at, session=session
+                )
+        return
+
+    advanced = await course_collection.find_one_and_update(guard, update)
+    if advanced is None:
+        raise stale_turn_error()
+    await update_chat_history(user_id, user_input, assistant_response, received_at)
+
+
+def queue_turn(user_id, course_state, state_update, user_input, assistant_response, received_at=None):
+    """Write-behind variant of commit_turn; the guard is checked in memory."""
+    from pymongo import UpdateOne
+
+    if state_update:
+        try:
+            write_behind.claim_version(user_id, course_state.get("version", 0))
+        except StaleWrite:
+            raise stale_turn_error()
+        guard = {
+            "user_id": user_id,
+            "current_section": course_state["current_section"],
+            "current_step": course_state["current_step"],
+        }
+        update = {
+            "$set": {**state_update, "updated_at": datetime.utcnow()},
+            "$inc": {"version": 1},
+        }
+        write_behind.enqueue(settings.COURSE_COLLECTION, user_id, UpdateOne(guard, update))
+
+    write_behind.enqueue(
+        settings.CHAT_COLLECTION,
+        user_id,
+        UpdateOne({"user_id": user_id}, chat_history_update(user_input, assistant_response, received_at), upsert=True),
+    )
+
+
+def stale_turn_error():
+    logger.warning("Course state changed while the turn was processed")
+    return HTTPException(status_code=409, detail="Bu adım zaten işlendi, lütfen tekrar deneyin.")
+
+
 def load_course_details(course_state):
-    """Load course details and current section/step information."""
+    """Load the shared course and build a cursor at the user's section/step."""
     try:
-        course = load_course_content(course_state["course_id"])
-        current_section = course_state["current_section"]
-        current_step = course_state.get("current_step", 0)
-        
-        # Bölüm ve adım sınırlarını kontrol et
-        if current_section >= len(course.sections):
-            current_section = len(course.sections) - 1
-            
-        current_section_obj = course.sections[current_section]
-        
-        if current_step >= len(current_section_obj.steps):
-            current_step = 0
-            current_section += 1
-            if current_section < len(course.sections):
-                current_section_obj = course.sections[current_section]
-        
-        current_step_obj = current_section_obj.steps[current_step]
-        
-        # Course state'i güncelle
-        course.current_section = current_section
-        current_section_obj.current_step = current_step
-        
-        return course, current_section_obj, current_step_obj
+        course_id = course_state["course_id"]
+        course = load_course_content(course_id)
+        # Bölüm ve adım sınırları düz adım indeksinden O(1) çözülür
+        current_section, current_step = course.step_index.locate(
+            course_state["current_section"], course_state.get("current_step", 0)
+        )
+
+        return CourseCursor(
+            course_id=course_id,
+            course=course,
+            section_index=current_section,
+            step_index=current_step,
+        )
     except Exception as e:
         logger.error(f"Error in load_course_details: {str(e)}")
         raise
@@ -158,101 +463,49 @@ def prepare_chat_history(chat_history):
 
 async def process_user_input(
     user_input,
-    current_step_obj,
-    current_section_obj,
+    cursor,
     course_state,
     agent_executor,
     user_id,
 ):
-    """Process user input and determine appropriate response."""
+    """Process user input and return the reply and any course-state update."""
     try:
-        current_step = course_state["current_step"]
-        current_section = course_state["current_section"]
-        
-        # Başlangıç kontrolü
-        if current_step == -1:
-            if "evet" in user_input.lower():
-                await course_collection.update_one(
-                    {"user_id": user_id},
-                    {"$set": {"current_step": 0}}
-                )
-                return current_section_obj.steps[0].content
-            else:
-                return "Hazır olduğunda 'evet' yazabilirsin. Başlamak için sabırsızlanıyorum!"
+        with span("scripted"):
+            scripted_reply, state_update = process_scripted_input(user_input, cursor, course_state)
+        set_labels(path="scripted")
+        if scripted_reply is not None:
+            return scripted_reply, state_update
+
+        cache_key = None
+        if response_cache.is_enabled_for(cursor):
+            cache_key = response_cache.make_key(cursor, user_input)
+            with span("llm_cache"):
+                cached_output = await response_cache.get(cache_key)
+            if cached_output is not None:
+                set_labels(path="cache")
+                return cached_output, state_update
 
-        # Normal akış - beklenen yanıtları kontrol et
-        if current_step_obj.expected_responses:
-            is_correct = any(
-                expected.lower() in user_input.lower()
-                for expected in current_step_obj.expected_responses
-            )
-            
-            if is_correct:
-                try:
-                    # Önce mevcut adımın next_action'ını kontrol et
-                    if current_step_obj.next_action == "FINISH":
-                        # Kursu bitir
-                        await course_collection.update_one(
-                            {"user_id": user_id},
-                            {
-                                "$set": {
-                                    "completed": True,
-                                    "completed_at": datetime.utcnow(),
-                                    "updated_at": datetime.utcnow()
-                                }
-                            }
-                        )
-                        return "Tebrikler! 🎉 Kursu başarıyla tamamladın! Harika bir iş çıkardın!"
-
-                    # Normal akış - sonraki adıma geç
-                    next_step = current_step + 1
-                    next_section = current_section
-                    
-                    # Mevcut bölümün son adımında mıyız kontrol et
-                    if next_step >= len(current_section_obj.steps):
-                        if current_step_obj.next_action == "NEXT":
-                            next_section = current_section + 1
-                            next_step = 0
-                    
-                    # Course state'i güncelle
-                    await course_collection.update_one(
-                        {"user_id": user_id},
-                        {
-                            "$set": {
-                                "current_step": next_step,
-                                "current_section": next_section,
-                                "updated_at": datetime.utcnow()
-                            }
-                        }
-                    )
-                    
-                    # Yeni course state'i yükle
-                    updated_course = load_course_content(course_state["course_id"])
-                    
-                    # Bölüm değişti mi kontrol et
-                    if next_section != current_section and next_section < len(updated_course.sections):
-                        next_section_obj = updated_course.sections[next_section]
-                        return f"Tebrikler! '{current_section_obj.title}' bölümünü tamamladın.\n\nYeni bölüm: {next_section_obj.title}\n\n{next_section_obj.steps[0].content}"
-                    
-                    # Aynı bölümde devam
-                    elif next_step < len(current_section_obj.steps):
-                        return f"Harika! Doğru cevap verdin.\n\n{current_section_obj.steps[next_step].content}"
-                        
-                except Exception as e:
-                    logger.error(f"Error processing correct answer: {str(e)}")
-                    raise HTTPException(
-                        status_code=500,
-                        detail="Doğru cevap işlenirken bir hata oluştu"
-                    )
-            else:
-                # Yanlış yanıt durumu
-                return f"Tekrar denemelisin. İpucu: Beklenen cevaplardan biri: {current_step_obj.expected_responses[0]}"
-        
         # Normal sohbet yanıtı için context oluştur
-        context_prompt = create_context_prompt(current_step_obj, user_input)
-        response = await agent_executor.ainvoke({"input": context_prompt})
-        return response.get("output", "")
+        set_labels(path="llm")
+        context_prompt = create_context_prompt(cursor.step, user_input)
+        inputs = {"input": context_prompt}
+        priority = llm_scheduler.priority_for(user_input, first_turn=len(agent_executor.chat_history) <= 1)
+        with span("llm"):
+            # Aynı anda gelen özdeş istekler tek bir LLM çağrısını paylaşır;
+            # upstream çağrı kabul kontrolünden geçer
+            response = await llm_singleflight.do(
+                agent_executor.request_key(inputs),
+                lambda: llm_scheduler.run(user_id, priority, lambda: agent_executor.ainvoke(inputs)),
+            )
+        output = response.get("output", "")
+        if cache_key:
+            await response_cache.set(cache_key, output)
+        return output, state_update
         
+    except HTTPException:
+        raise
+    except LLMOverloaded as e:
+        raise overloaded_error(e)
     except Exception as e:
         logger.error(f"Error in process_user_input: {str(e)}")
         raise HTTPException(
@@ -261,6 +514,67 @@ async def process_user_input(
         )
 
 
+def overloaded_error(error: LLMOverloaded) -> HTTPException:
+    logger.warning(f"Shedding LLM request: {error.reason}")
+    return HTTPException(
+        status_code=503,
+        detail="Şu anda çok yoğunuz, lütfen birazdan tekrar dene.",
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+def process_scripted_input(user_input, cursor, course_state):
+    """Answer from the course script (start prompt, expected responses).
+
+    Returns (reply, state_update); reply is None when the turn needs the LLM.
+    The state update is applied by commit_turn.
+    """
+    current_section_obj = cursor.section
+    current_step_obj = cursor.step
+    current_step = course_state["current_step"]
+    
+    # Başlangıç kontrolü
+    if current_step == -1:
+        if "evet" in user_input.lower():
+            return current_section_obj.steps[0].content, {"current_step": 0}
+        else:
+            return "Hazır olduğunda 'evet' yazabilirsin. Başlamak için sabırsızlanıyorum!", None
+
+    # Normal akış - beklenen yanıtları kontrol et
+    if current_step_obj.expected_responses:
+        is_correct = current_step_obj.matches(user_input)
+        
+        if is_correct:
+            # Sonraki adım kurs indeksindeki next_ordinal işaretçisinden okunur;
+            # FINISH adımı ve kursun son adımı kursu bitirir
+            course = cursor.course
+            next_entry = course.step_index.next_entry(cursor.section_index, cursor.step_index)
+            if next_entry is None:
+                return (
+                    "Tebrikler! 🎉 Kursu başarıyla tamamladın! Harika bir iş çıkardın!",
+                    {"completed": True, "completed_at": datetime.utcnow()},
+                )
+
+            state_update = {"current_step": next_entry.step_index, "current_section": next_entry.section_index}
+
+            # Aynı bölümde devam
+            if next_entry.section_index == cursor.section_index:
+                return f"Harika! Doğru cevap verdin.\n\n{current_section_obj.steps[next_entry.step_index].content}", state_update
+
+            # Bölüm değişti
+            if current_step_obj.next_action == "NEXT":
+                next_section_obj = course.sections[next_entry.section_index]
+                return f"Tebrikler! '{current_section_obj.title}' bölümünü tamamladın.\n\nYeni bölüm: {next_section_obj.title}\n\n{next_section_obj.steps[0].content}", state_update
+
+            # Bölüm sonunda devam adımı yoksa ilerleme kaydedilir, yanıtı LLM verir
+            return None, state_update
+        else:
+            # Yanlış yanıt durumu
+            return f"Tekrar denemelisin. İpucu: Beklenen cevaplardan biri: {current_step_obj.expected_responses[0]}", None
+
+    return None, None
+
+
 def create_context_prompt(current_step_obj, user_input):
     """Create context prompt for the AI model based on current step and user input."""
     return f"""
@@ -344,42 +658,103 @@ def parse_response_text(response_text):
     return is_correct, explanation, continuation
 
 
-async def update_chat_history(user_id, user_input, assistant_response):
-    """Update chat history with user and assistant messages."""
+def chat_history_update(user_input, assistant_response, received_at=None):
+    """Update document appending one turn, keeping only the newest messages."""
+    user_message = Message(role="user", content=user_input)
+    if received_at:
+        user_message.timestamp = received_at
+    assistant_message = Message(role="assistant", content=assistant_response)
+
+    return {
+        "$push": {
+            "messages": {
+                "$each": [user_message.dict(), assistant_message.dict()],
+                "$slice": -settings.CHAT_HISTORY_MAX_MESSAGES,
+            }
+        },
+        "$set": {"updated_at": datetime.utcnow()},
+    }
+
+
+async def update_chat_history(user_id, user_input, assistant_response, received_at=None, session=None):
+    """Append user and assistant messages, keeping only the newest messages."""
     await chat_collection.update_one(
         {"user_id": user_id},
-        {
-            "$push": {
-                "messages": [
-                    {"role": "user", "content": user_input},
-                    {"role": "assistant", "content": assistant_response},
-                ]
-            },
-            "$set": {"updated_at": datetime.utcnow()},
-        },
+        chat_history_update(user_input, assistant_response, received_at),
         upsert=True,
+        session=session,
     )
 
 
 @router.get("/history/{user_id}")
-async def get_chat_history(user_id: str):
+async def get_chat_history(
+    user_id: str,
+    before: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=200),
+):
     """
-    Get chat history for a specific user
+    Get a page of chat history for a specific user
+
+    Without cursors the newest `limit` messages are returned. Pass the
+    returned `older_cursor` as `before` to page backwards, or
+    `newer_cursor` as `after` to page forwards.
     """
-    chat_history = await chat_collection.find_one({"user_id": user_id})
-    if not chat_history:
-        return {"messages": []}
-    return chat_history
+    conditions = []
+    if before:
+        conditions.append({"$lt": ["$$message.timestamp", to_timestamp_cursor(before)]})
+    if after:
+        conditions.append({"$gt": ["$$message.timestamp", to_timestamp_cursor(after)]})
+
+    messages = "$messages"
+    if conditions:
+        messages = {
+            "$filter": {
+                "input": "$messages",
+                "as": "message",
+                "cond": {"$and": conditions},
+            }
+        }
+
+    # "after" ile ileri, diğer durumlarda en yeniden geriye doğru sayfalanır
+    page = [messages, limit] if after and not before else [messages, -limit]
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$project": {"_id": 0, "messages": {"$slice": page}}},
+    ]
+    await write_behind.flush_user(user_id)
+    result = await chat_collection.aggregate(pipeline).to_list(length=1)
+    page_messages = (result[0].get("messages") or []) if result else []
+
+    # Mongo belgeleri doğrudan JSON'a kodlanır (jsonable_encoder atlanır)
+    return ORJSONResponse({
+        "messages": page_messages,
+        "older_cursor": page_messages[0].get("timestamp") if page_messages else None,
+        "newer_cursor": page_messages[-1].get("timestamp") if page_messages else None,
+    })
+
+
+def to_timestamp_cursor(value: datetime) -> str:
+    """Match the naive UTC ISO format stored by Message.dict()."""
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
 
 
 @router.get("/course-content/{course_id}")
-async def get_course_content(course_id: str):
+async def get_course_content(course_id: str, request: Request):
     """
     Get course content and structure
     """
     try:
-        course = load_course_content(course_id)
-        return course.dict()
+        # ETag kurs YAML dosyasının içerik özetinden türetilir
+        etag = make_etag("course-content", course_id, get_course_hash(course_id))
+        return cached_json_response(
+            request,
+            f"course-content:{course_id}",
+            etag,
+            lambda: load_course_content(course_id).dict(),
+        )
     except Exception as e:
         logger.error(f"Error loading course content: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -390,6 +765,7 @@ async def get_course_state(user_id: str):
     """
     Get current course state for a user
     """
+    await write_behind.flush_user(user_id)
     course_state = await course_collection.find_one({"user_id": user_id})
     if not course_state:
         return {"current_section": 0, "current_step": 0}
@@ -399,31 +775,50 @@ async def get_course_state(user_id: str):
     }
 
 
+@router.get("/progress/{user_id}")
+async def get_progress(user_id: str):
+    """
+    Get a compact progress summary for a user's current course
+    """
+    await write_behind.flush_user(user_id)
+    course_state = await course_collection.find_one(
+        {"user_id": user_id},
+        {"_id": 0, "course_id": 1, "current_section": 1, "current_step": 1, "completed": 1},
+    )
+    if not course_state or "course_id" not in course_state:
+        raise HTTPException(status_code=404, detail="Course state not found")
+
+    try:
+        course = load_course_content(course_state["course_id"])
+        # Yük her konum için önceden hesaplanır ve önbellekte tutulur
+        progress = course.step_index.progress(
+            course_state.get("current_section", 0),
+            course_state.get("current_step", 0),
+            course_state.get("completed", False),
+        )
+        return {"course_id": course_state["course_id"], **progress}
+    except Exception as e:
+        logger.error(f"Error getting progress: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/available-courses")
-async def get_available_courses():
+async def get_available_courses(request: Request):
     """
     Get list of available courses
     """
     try:
-        # courses klasöründeki tüm yaml dosyalarını listele
-        courses_dir = "courses"
-        course_files = [f.replace('.yaml', '') for f in os.listdir(courses_dir) if f.endswith('.yaml')]
-        
-        # Her kurs için başlık ve açıklamayı al
-        courses = []
-        for course_id in course_files:
-            try:
-                course = load_course_content(course_id)
-                courses.append({
-                    "id": course_id,
-                    "title": course.title,
-                    "description": course.description
-                })
-            except Exception as e:
-                logger.error(f"Error loading course {course_id}: {str(e)}")
-                continue
-                
-        return courses
+        # Başlık ve açıklamalar katalog başlığından okunur; bozuk kurslar katalogda yer almaz
+        catalog = list_courses()
+        courses = [
+            {"id": entry["id"], "title": entry["title"], "description": entry["description"]}
+            for entry in catalog
+        ]
+        hashes = [f"{entry['id']}:{entry['source_hash']}" for entry in catalog]
+
+        return cached_json_response(
+            request, "available-courses", make_etag("available-courses", *hashes), lambda: courses
+        )
     except Exception as e:
         logger.error(f"Error getting available courses: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
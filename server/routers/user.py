@@ -1,30 +1,143 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from motor.motor_asyncio import AsyncIOMotorCollection
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from bson import ObjectId
+from pydantic import ValidationError
 
 from server import database
-from server.models.user import User
+from server.config import settings
+from server.models.user import User, UserPage
+from server.services.serialization import dumps
 
 router = APIRouter(
     prefix="/users",
     tags=["users"]
 )
 
-user_collection: AsyncIOMotorCollection = database.db.get_collection("users")
+user_collection = database.collection(settings.USER_COLLECTION)
+# Listelemede yalnızca User alanları okunur; _id, name ve email her zaman gelir
+USER_FIELDS = {field.alias or name for name, field in User.__fields__.items()}
+REQUIRED_USER_FIELDS = {"_id", "name", "email"}
 
 @router.post("/", response_model=User)
 async def create_user(user: User):
-    result = await user_collection.insert_one(user.dict(by_alias=True))
+    result = await user_collection.insert_one(user.dict(by_alias=True, exclude_none=True))
     if not result.inserted_id:
         raise HTTPException(status_code=400, detail="User could not be created")
     return await user_collection.find_one({"_id": result.inserted_id})
 
-@router.get("/", response_model=List[User])
-async def get_users():
-    users = []
-    async for user in user_collection.find():
-        users.append(user)
-    return users
+def encode_cursor(value) -> str:
+    return f"oid:{value}" if isinstance(value, ObjectId) else f"str:{value}"
+
+
+def decode_cursor(cursor: str):
+    kind, _, raw = cursor.partition(":")
+    if kind == "oid" and ObjectId.is_valid(raw):
+        return ObjectId(raw)
+    if kind == "str":
+        return raw
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def listing_query(after: Optional[str], fields: Optional[str]):
+    """Filter and projection for a keyset scan ordered by _id."""
+    query = {}
+    if after:
+        value = decode_cursor(after)
+        if isinstance(value, ObjectId):
+            query = {"_id": {"$gt": value}}
+        else:
+            # String _id'ler ObjectId'lerden önce sıralanır; tip sınırı da geçilir
+            query = {"$or": [{"_id": {"$gt": value}}, {"_id": {"$type": "objectId"}}]}
+    requested = USER_FIELDS
+    if fields:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - USER_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    projection = {field: 1 for field in sorted(requested | REQUIRED_USER_FIELDS)}
+    return query, projection
+
+
+@router.get("/", response_model=UserPage)
+async def get_users(
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1),
+    fields: Optional[str] = None,
+):
+    """
+    Get one page of users ordered by _id
+
+    Pass the returned `next_cursor` as `after` for the next page; `fields`
+    is a comma-separated subset of the User fields to read (_id, name and
+    email are always included).
+    """
+    limit = min(limit, settings.USER_PAGE_MAX_LIMIT)
+    query, projection = listing_query(after, fields)
+    users = await user_collection.find(query, projection).sort("_id", 1).limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = encode_cursor(users[limit - 1]["_id"]) if len(users) > limit else None
+    return {"users": users[:limit], "next_cursor": next_cursor}
+
+
+@router.get("/stream")
+async def stream_users(
+    after: Optional[str] = None,
+    limit: int = Query(0, ge=0),
+    fields: Optional[str] = None,
+):
+    """
+    Stream users as NDJSON, one document per line, straight from the cursor
+    """
+    query, projection = listing_query(after, fields)
+    cursor = user_collection.find(query, projection).sort("_id", 1).batch_size(500)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    async def lines():
+        async for user in cursor:
+            yield dumps(user) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/bulk")
+async def bulk_create_users(rows: List[dict]):
+    """
+    Validate and insert a roster of users
+
+    Rows are inserted in unordered batches; invalid rows and rows rejected
+    by Mongo (e.g. duplicate _id) are reported by their index in the request.
+    """
+    from pymongo.errors import BulkWriteError
+
+    errors = []
+    documents, positions = [], []
+    for index, row in enumerate(rows):
+        try:
+            documents.append(User.parse_obj(row).dict(by_alias=True, exclude_none=True))
+            positions.append(index)
+        except ValidationError as e:
+            errors.append({"index": index, "error": "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            )})
+
+    inserted = 0
+    batch_size = settings.USER_BULK_BATCH_SIZE
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+        try:
+            result = await user_collection.insert_many(batch, ordered=False)
+            inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            inserted += e.details.get("nInserted", 0)
+            for write_error in e.details.get("writeErrors", []):
+                errors.append({
+                    "index": positions[start + write_error["index"]],
+                    "error": write_error.get("errmsg", "write error"),
+                })
+
+    errors.sort(key=lambda error: error["index"])
+    return {"received": len(rows), "inserted": inserted, "failed": len(errors), "errors": errors}
 
 @router.get("/{user_id}", response_model=User)
 async def get_user(user_id: str):
@@ -0,0 +1,171 @@
+import re
+import unicodedata
+from typing import Iterable, List
+
+# Türkçe harfler NFKD'ye gitmeden sadeleştirilir ("ı" NFKD ile ayrışmaz).
+# "I"/"ı" ve "İ"/"i" aynı harfe indirgendiği için Türkçe I sorunu ortadan kalkar;
+# "İ" ise lower() öncesi değiştirilir, yoksa "i" + birleşik nokta üretir.
+_FOLD = (
+    ("ı", "i"), ("ç", "c"), ("ğ", "g"), ("ö", "o"), ("ş", "s"),
+    ("ü", "u"), ("â", "a"), ("î", "i"), ("û", "u"),
+)
+# Matematik cevapları ("+", "-" ...) noktalama olarak silinmemeli
+_OPERATORS = "+-*/=<>%^×÷"
+_TOKEN_RE = re.compile(r"[^\W_]+|[" + re.escape(_OPERATORS) + r"]")
+# Cevap eşleştirmede en az bu uzunluktaki kelimeler kök olarak ekli biçimleri de
+# kapsar ("çekirdek" -> "çekirdekte"); daha kısa kelimeler ("su", "en") Türkçe
+# harfleriyle birlikte tam eşleşmelidir, yoksa "şu"/"su" veya "enerji"/"en" karışır
+MIN_STEM_LENGTH = 4
+# Sadeleştirilmiş (ASCII) çekim ekleri: çoğul, iyelik, hâl, "-ki" ve "-dır";
+# yapım ekleri ("-inci", "-er") kökü başka bir kelimeye çevirdiği için yoktur
+_SUFFIX_RE = re.compile(
+    r"(?:l[ae]r)?"
+    r"(?:[iu]m[iu]z|[iu]n[iu]z|l[ae]r[iu]|[iu]m|[iu]n|s?[iu])?"
+    r"(?:n?[dt][ae]n?|n?[iu]n|y?l[ae]|y?[iu]|y?[ae]|n[iu]|n[ae])?"
+    r"(?:ki)?"
+    r"(?:[dt][iu]r)?"
+)
+# Ünlüyle başlayan ekten önce yumuşayan son ünsüzler ("sıcak" -> "sıcağı")
+_SOFTENING = {"k": "g", "p": "b", "t": "d"}
+_VOWELS = "aeiou"
+
+
+def _fold(text: str) -> str:
+    for source, target in _FOLD:
+        if source in text:
+            text = text.replace(source, target)
+    if not text.isascii():
+        text = "".join(
+            ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch)
+        )
+    return text
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Turkish-aware casefold, strip diacritics and punctuation, split into words."""
+    # ASCII girdide düz lower() aynı sonucu verir
+    if text.isascii():
+        return _TOKEN_RE.findall(text.lower())
+    return _TOKEN_RE.findall(_fold(text.replace("İ", "i").lower()))
+
+
+def match_tokens(text: str) -> List[str]:
+    """Tokens for answer matching: like normalize_tokens, but words shorter
+    than MIN_STEM_LENGTH keep their Turkish letters."""
+    if text.isascii():
+        return _TOKEN_RE.findall(text.lower())
+    tokens = _TOKEN_RE.findall(text.replace("İ", "i").replace("I", "ı").lower())
+    return [token if len(token) < MIN_STEM_LENGTH else _fold(token) for token in tokens]
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(normalize_tokens(text))
+
+
+class ResponseMatcher:
+    """Aho-Corasick automaton over normalized word tokens.
+
+    Every expected response becomes a token sequence, so a single pass over
+    the user's input finds any whole-word (or whole-phrase) match. Words of
+    at least MIN_STEM_LENGTH letters also match their inflected forms (the
+    word followed by plural, possessive, case, "-ki" or "-dır" suffixes), so
+    "atmosferi" and "helyuma" are accepted but "sekizinci" is not.
+    """
+
+    __slots__ = ("patterns", "_goto", "_fail", "_out", "_stems", "_softened", "_stem_lengths")
+
+    def __init__(self, expected_responses: Iterable[str]):
+        self.patterns = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [False]
+        self._stems = {}  # kök biçimi (yumuşamış olanlar dahil) -> beklenen kelime
+        self._softened = set()
+
+        for expected in expected_responses or []:
+            tokens = match_tokens(expected)
+            if tokens:
+                self.patterns.append(tuple(tokens))
+                self._add(tokens)
+                for token in tokens:
+                    if len(token) >= MIN_STEM_LENGTH and token.isalpha():
+                        self._stems[token] = token
+                        soft = _SOFTENING.get(token[-1])
+                        if soft:
+                            self._stems[token[:-1] + soft] = token
+                            self._softened.add(token[:-1] + soft)
+        self._stem_lengths = sorted({len(stem) for stem in self._stems})
+        self._build()
+
+    def _add(self, tokens):
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(False)
+            state = nxt
+        self._out[state] = True
+
+    def _build(self):
+        # Kök çocuklarının fail bağlantısı köktür; gerisi BFS ile kurulur
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(token, 0)
+                self._out[nxt] = self._out[nxt] or self._out[self._fail[nxt]]
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def _step(self, state: int, token: str) -> int:
+        goto, fail = self._goto, self._fail
+        while state and token not in goto[state]:
+            state = fail[state]
+        return goto[state].get(token, 0)
+
+    def matches(self, user_input: str) -> bool:
+        """Return True if any expected response occurs as (inflected) words in the input."""
+        if not self.patterns:
+            return False
+        goto, fail, out = self._goto, self._fail, self._out
+        stems, softened, stem_lengths = self._stems, self._softened, self._stem_lengths
+        state, states = 0, None
+        for token in match_tokens(user_input):
+            candidates = None
+            if token.isalpha():
+                for length in stem_lengths:
+                    if length >= len(token):
+                        break
+                    stem, rest = token[:length], token[length:]
+                    if (
+                        stem in stems
+                        and _SUFFIX_RE.fullmatch(rest)
+                        and (stem not in softened or rest[0] in _VOWELS)
+                    ):
+                        candidates = (candidates or [token]) + [stems[stem]]
+            if candidates is None and states is None:
+                while state and token not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(token, 0)
+                if out[state]:
+                    return True
+                continue
+            # Bir kelime birden fazla köke uyabilir; olası durumlar birlikte izlenir
+            states = {
+                self._step(previous, candidate)
+                for previous in (states or (state,))
+                for candidate in (candidates or (token,))
+            }
+            if any(out[next_state] for next_state in states):
+                return True
+            if len(states) == 1:
+                (state,), states = states, None
+        return False
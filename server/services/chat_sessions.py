@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Optional
+from server.config import settings
+from server.models.course import CourseCursor
+from server.services.langchain.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSession:
+    """Turn context of one user, kept in memory between WebSocket turns.
+
+    Holds the course state document, the cursor on the shared compiled
+    course and the last CHAT_CONTEXT_MESSAGES messages, i.e. everything a
+    turn would otherwise read from Mongo and rebuild.
+    """
+
+    def __init__(self, user_id: str, course_state: dict, history: list, cursor: CourseCursor):
+        self.user_id = user_id
+        self.course_state = course_state
+        self.history = history
+        self.cursor = cursor
+        self.lock = asyncio.Lock()  # kullanıcının turları sırayla işlenir
+        self.last_active = time.monotonic()
+        self.size = self._measure()
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def record_turn(self, user_input: str, output: str, state_update: Optional[dict]):
+        """Apply a finished turn to the in-memory state (persisted separately)."""
+        self.history.append({"role": "user", "content": user_input})
+        self.history.append({"role": "assistant", "content": output})
+        del self.history[:-settings.CHAT_CONTEXT_MESSAGES]
+        if state_update:
+            self.course_state.update(state_update)
+            self.course_state["version"] = self.course_state.get("version", 0) + 1
+        self.size = self._measure()
+
+    def _measure(self) -> int:
+        # Yaklaşık bellek: oturum, durum ve geçmiş; paylaşılan kurs nesnesi sayılmaz
+        size = sys.getsizeof(self) + sys.getsizeof(self.course_state) + sys.getsizeof(self.history)
+        for message in self.history:
+            size += sys.getsizeof(message) + sum(sys.getsizeof(value) for value in message.values())
+        return size
+
+
+class ChatSessionRegistry:
+    """In-memory ChatSessions by user id with idle and LRU eviction.
+
+    Sessions are loaded once per user (concurrent loads are coalesced) and
+    dropped after `idle_seconds` without a turn, or least recently used
+    first beyond `max_sessions`. An evicted or invalidated session is simply
+    reloaded from Mongo on the user's next turn.
+    """
+
+    def __init__(self, idle_seconds: float, max_sessions: int, sweep_seconds: float):
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self.sweep_seconds = sweep_seconds
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._connections = Counter()  # user_id -> open WebSocket connections
+        self._generations = Counter()  # user_id -> invalidations, to drop loads that raced one
+        self._loads = SingleFlight()
+        self._task = None
+        self.stats = {"hits": 0, "loads": 0, "evicted": 0, "invalidated": 0}
+
+    async def acquire(self, user_id: str, load: Callable[[str], Awaitable[Optional[ChatSession]]]):
+        """Return the user's session, loading it with `load` if needed (None if no course)."""
+        self._ensure_running()
+        session = self._sessions.get(user_id)
+        if session is not None:
+            self._sessions.move_to_end(user_id)
+            session.touch()
+            self.stats["hits"] += 1
+            return session
+
+        generation = self._generations[user_id]
+        session = await self._loads.do(user_id, lambda: self._load(user_id, load))
+        if session is None:
+            return None
+        if generation == self._generations[user_id]:
+            self._sessions[user_id] = session
+            self._sessions.move_to_end(user_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.stats["evicted"] += 1
+        session.touch()
+        return session
+
+    async def _load(self, user_id: str, load):
+        self.stats["loads"] += 1
+        return await load(user_id)
+
+    def invalidate(self, user_id: str):
+        """Forget the user's session after its state changed outside of it."""
+        self._generations[user_id] += 1
+        if self._sessions.pop(user_id, None) is not None:
+            self.stats["invalidated"] += 1
+
+    def connected(self, user_id: str):
+        self._connections[user_id] += 1
+
+    def disconnected(self, user_id: str):
+        self._connections[user_id] -= 1
+        if self._connections[user_id] <= 0:
+            del self._connections[user_id]
+
+    def sweep(self):
+        """Evict sessions idle for longer than idle_seconds."""
+        cutoff = time.monotonic() - self.idle_seconds
+        idle = [
+            user_id for user_id, session in self._sessions.items()
+            if session.last_active < cutoff and not session.lock.locked()
+        ]
+        for user_id in idle:
+            del self._sessions[user_id]
+        self.stats["evicted"] += len(idle)
+        return len(idle)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_seconds)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Chat session sweep error: {str(e)}")
+
+    async def stop(self):
+        """Stop the sweeper and drop all sessions (lifespan shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._sessions.clear()
+
+    def get_stats(self) -> dict:
+        sizes = [session.size for session in self._sessions.values()]
+        return {
+            **self.stats,
+            "sessions": len(sizes),
+            "connections": sum(self._connections.values()),
+            "memory_bytes": sum(sizes),
+            "max_session_bytes": max(sizes, default=0),
+        }
+
+
+chat_sessions = ChatSessionRegistry(
+    idle_seconds=settings.CHAT_SESSION_IDLE_SECONDS,
+    max_sessions=settings.CHAT_SESSION_MAX,
+    sweep_seconds=settings.CHAT_SESSION_SWEEP_SECONDS,
+)
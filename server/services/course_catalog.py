@@ -0,0 +1,342 @@
+"""Precompiled course catalog bundle.
+
+All `courses/*.yaml` files are validated and packed into one msgpack file:
+
+    MAGIC | uint32 version | uint32 header length | header | course blobs
+
+The header holds the listing (title, description, source hash, file stat)
+and an offset table into the blob area. Courses are unpacked and parsed
+lazily on first use. Build it ahead of time with
+
+    python -m server.services.course_catalog [--strict]
+"""
+import argparse
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+import msgpack
+import yaml
+from server.config import settings
+from server.models.course import Course, CourseSection, Step
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"NEYAPCAT"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<8sII")
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def resolve_path(path: str) -> Path:
+    """Resolve a configured path against the project root instead of the cwd."""
+    path = Path(path)
+    return path if path.is_absolute() else PROJECT_ROOT / path
+
+
+def parse_course(course_data: dict) -> Course:
+    """Build a Course from the raw YAML structure"""
+    sections = []
+    for idx, section_data in enumerate(course_data.get('course_sections', [])):
+        first_step_content = section_data.get('steps', [{}])[0].get('content', '')
+
+        steps = [
+            Step(
+                step=step['step'],
+                content=step['content'].strip(),
+                expected_responses=step.get('expected_responses', []),
+                next_action=step.get('next_action', 'CONTINUE')
+            )
+            for step in section_data.get('steps', [])
+        ]
+        for step in steps:
+            step.compile_matcher()
+
+        sections.append(
+            CourseSection(
+                title=section_data['sub_title'],
+                content=first_step_content,
+                order=idx + 1,
+                steps=steps
+            )
+        )
+
+    course = Course(
+        title=course_data['course_title'],
+        description=course_data['course_description'],
+        sections=sections,
+        llm_cache=course_data.get('llm_cache', True)
+    )
+    course.step_index  # düz adım indeksini yüklemeyle birlikte derle
+    return course
+
+
+class CourseCatalog:
+    """A loaded catalog bundle; course bodies are unpacked on first access."""
+
+    def __init__(self, path: Path, header: dict, data: bytes):
+        self.path = path
+        self.header = header
+        self.entries: Dict[str, dict] = header["courses"]
+        self.invalid: Dict[str, dict] = header.get("invalid", {})  # atlanan bozuk dosyalar
+        self._data = data  # mmap (veya bellek içi bytes) üzerinde blob alanı
+        self._courses: Dict[str, Course] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @classmethod
+    def load(cls, path: Path) -> "CourseCatalog":
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = _PREFIX.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} course catalog")
+        start = _PREFIX.size
+        header = msgpack.unpackb(data[start:start + header_length])
+        return cls(path, header, memoryview(data)[start + header_length:])
+
+    def course_ids(self) -> list:
+        return list(self.entries)
+
+    def blob(self, course_id: str) -> bytes:
+        entry = self.entries[course_id]
+        return bytes(self._data[entry["offset"]:entry["offset"] + entry["length"]])
+
+    def get(self, course_id: str) -> Course:
+        course = self._courses.get(course_id)
+        if course is not None:
+            self.stats["hits"] += 1
+            return course
+        if course_id not in self.entries:
+            raise FileNotFoundError(f"Course {course_id} not found")
+        with self._lock:
+            course = self._courses.get(course_id)
+            if course is None:
+                self.stats["misses"] += 1
+                course = parse_course(msgpack.unpackb(self.blob(course_id)))
+                self._courses[course_id] = course
+        return course
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "size": len(self._courses),
+            "courses": len(self.entries),
+            "invalid": len(self.invalid),
+        }
+
+
+def _source_files(courses_dir: Path) -> Dict[str, os.stat_result]:
+    return {
+        path.stem: path.stat()
+        for path in sorted(courses_dir.glob("*.yaml"))
+    }
+
+
+def build_catalog(courses_dir: Path, output_path: Path, previous: Optional[CourseCatalog] = None):
+    """Validate every course YAML and write the bundle atomically.
+
+    Unchanged files (same stat or same sha256 as in `previous`) reuse their
+    compiled blob. A malformed file is skipped, or keeps its last good
+    version from `previous`. Returns (CourseCatalog, {course_id: error}).
+    """
+    previous_entries = previous.entries if previous else {}
+    previous_invalid = previous.invalid if previous else {}
+    courses, invalid, blobs, errors = {}, {}, [], {}
+    offset = 0
+
+    for course_id, stat in _source_files(courses_dir).items():
+        known_bad = previous_invalid.get(course_id)
+        if known_bad and (known_bad["mtime_ns"], known_bad["size"]) == (stat.st_mtime_ns, stat.st_size):
+            # Değişmemiş bozuk dosya yeniden ayrıştırılmaz
+            invalid[course_id] = known_bad
+            errors[course_id] = known_bad["error"]
+            continue
+        old = previous_entries.get(course_id)
+        try:
+            if old and old["mtime_ns"] == stat.st_mtime_ns and old["size"] == stat.st_size:
+                blob, source_hash, title, description = previous.blob(course_id), old["source_hash"], old["title"], old["description"]
+            else:
+                raw = (courses_dir / f"{course_id}.yaml").read_bytes()
+                source_hash = hashlib.sha256(raw).hexdigest()
+                if old and old["source_hash"] == source_hash:
+                    blob, title, description = previous.blob(course_id), old["title"], old["description"]
+                else:
+                    course_data = yaml.safe_load(raw.decode("utf-8"))
+                    course = parse_course(course_data)  # doğrulama
+                    blob = msgpack.packb(course_data, default=str)
+                    title, description = course.title, course.description
+        except Exception as e:
+            errors[course_id] = str(e)
+            if not old:
+                logger.error(f"Skipping malformed course {course_id}: {str(e)}")
+                invalid[course_id] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "error": str(e)}
+                continue
+            # Bozuk düzenlemede son geçerli sürüm korunur
+            logger.error(f"Keeping last good version of course {course_id}: {str(e)}")
+            blob, source_hash, title, description = previous.blob(course_id), old["source_hash"], old["title"], old["description"]
+
+        courses[course_id] = {
+            "title": title,
+            "description": description,
+            "source_hash": source_hash,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "offset": offset,
+            "length": len(blob),
+        }
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = msgpack.packb({"built_at": time.time(), "courses": courses, "invalid": invalid})
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Önce geçici dosyaya yaz, sonra atomik olarak değiştir; her işçi kendi
+    # geçici dosyasını kullanır, eşlenmiş (mmap) paket asla üzerine yazılmaz
+    fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, prefix=f".{output_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+            file.write(header)
+            for blob in blobs:
+                file.write(blob)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return CourseCatalog.load(output_path), errors
+
+
+def is_stale(catalog: CourseCatalog, courses_dir: Path) -> bool:
+    """True if any course file was added, removed or changed since the build."""
+    sources = _source_files(courses_dir)
+    known = {**catalog.invalid, **catalog.entries}
+    if sources.keys() != known.keys():
+        return True
+    return any(
+        (stat.st_mtime_ns, stat.st_size) != (known[course_id]["mtime_ns"], known[course_id]["size"])
+        for course_id, stat in sources.items()
+    )
+
+
+_catalog: Optional[CourseCatalog] = None
+_catalog_lock = threading.Lock()
+_watcher: Optional["CatalogWatcher"] = None
+_last_check = 0.0  # izleyici kapalıyken son bayatlık kontrolü (monotonic)
+
+
+def get_courses_dir() -> Path:
+    return resolve_path(settings.COURSES_DIR)
+
+
+def get_catalog() -> CourseCatalog:
+    """Return the current catalog, loading or (re)building the bundle on first use.
+
+    Without the watcher thread, changed YAML files are picked up here: at
+    most every COURSE_CATALOG_POLL_SECONDS a lookup checks file mtimes and
+    sizes and rebuilds the catalog if one changed.
+    """
+    global _last_check
+    catalog = _catalog
+    if catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _load_or_build()
+            catalog = _catalog
+        _last_check = time.monotonic()
+    elif _watcher is None and time.monotonic() - _last_check >= settings.COURSE_CATALOG_POLL_SECONDS:
+        _last_check = time.monotonic()
+        try:
+            reload_catalog()
+        except Exception as e:
+            logger.error(f"Course catalog reload failed: {str(e)}")
+        catalog = _catalog
+    return catalog
+
+
+def _load_or_build():
+    global _catalog
+    courses_dir = get_courses_dir()
+    bundle_path = resolve_path(settings.COURSE_CATALOG_PATH)
+    previous = None
+    try:
+        previous = CourseCatalog.load(bundle_path)
+        if not is_stale(previous, courses_dir):
+            _catalog = previous
+            return
+    except (FileNotFoundError, ValueError, struct.error, KeyError) as e:
+        logger.info(f"Building course catalog ({type(e).__name__}: {e})")
+    _catalog, _ = build_catalog(courses_dir, bundle_path, previous)
+
+
+def reload_catalog() -> bool:
+    """Rebuild from changed YAML files and swap the catalog atomically.
+
+    Requests holding a Course from the old catalog keep using it; new
+    lookups see the new one. Returns True if the catalog was swapped.
+    """
+    global _catalog
+    with _catalog_lock:
+        current = _catalog
+        if current is not None and not is_stale(current, get_courses_dir()):
+            return False
+        if current is None:
+            _load_or_build()
+            return True
+        catalog, _ = build_catalog(get_courses_dir(), resolve_path(settings.COURSE_CATALOG_PATH), current)
+        _catalog = catalog
+    logger.info(f"Course catalog reloaded ({len(catalog.entries)} courses)")
+    return True
+
+
+class CatalogWatcher(threading.Thread):
+    """Polls the courses directory and reloads the catalog when YAML changes."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="course-catalog-watcher", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                reload_catalog()
+            except Exception as e:
+                logger.error(f"Error reloading course catalog: {str(e)}")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_watcher():
+    global _watcher
+    if _watcher is None:
+        _watcher = CatalogWatcher(settings.COURSE_CATALOG_POLL_SECONDS)
+        _watcher.start()
+
+
+def stop_watcher():
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Compile courses/*.yaml into the catalog bundle")
+    parser.add_argument("--strict", action="store_true", help="exit non-zero if any course is malformed")
+    args = parser.parse_args()
+
+    output_path = resolve_path(settings.COURSE_CATALOG_PATH)
+    catalog, errors = build_catalog(get_courses_dir(), output_path)
+    print(f"{len(catalog.entries)} courses -> {output_path} ({output_path.stat().st_size} bytes)")
+    for course_id, error in errors.items():
+        print(f"  {course_id}: {error}")
+    sys.exit(1 if errors and args.strict else 0)
@@ -1,42 +1,37 @@
-import yaml
-import os
-from server.models.course import Course, CourseSection, Step
+from server.models.course import Course
+from server.services.course_catalog import get_catalog
+
+
+def list_course_ids() -> list:
+    """List the ids of all valid courses in the catalog"""
+    return get_catalog().course_ids()
+
+
+def list_courses() -> list:
+    """Id, title, description and source hash of every course, from the catalog header"""
+    return [
+        {"id": course_id, "title": entry["title"], "description": entry["description"], "source_hash": entry["source_hash"]}
+        for course_id, entry in get_catalog().entries.items()
+    ]
+
 
 def load_course_content(course_id: str) -> Course:
-    """Load course content from a YAML file"""
-    course_path = f"courses/{course_id}.yaml"
-    
-    if not os.path.exists(course_path):
+    """Load course content from the catalog, parsing it on first use.
+
+    The returned Course is shared between requests and must not be mutated;
+    use CourseCursor for per-request position.
+    """
+    return get_catalog().get(course_id)
+
+
+def get_course_hash(course_id: str) -> str:
+    """Return the sha256 of the course's YAML file as compiled into the catalog"""
+    entry = get_catalog().entries.get(course_id)
+    if entry is None:
         raise FileNotFoundError(f"Course {course_id} not found")
-        
-    with open(course_path, 'r', encoding='utf-8') as file:
-        course_data = yaml.safe_load(file)
-        
-    sections = []
-    for idx, section_data in enumerate(course_data.get('course_sections', [])):
-        first_step_content = section_data.get('steps', [{}])[0].get('content', '')
-        
-        steps = [
-            Step(
-                step=step['step'],
-                content=step['content'].strip(),
-                expected_responses=step.get('expected_responses', []),
-                next_action=step.get('next_action', 'CONTINUE')
-            )
-            for step in section_data.get('steps', [])
-        ]
-        
-        sections.append(
-            CourseSection(
-                title=section_data['sub_title'],
-                content=first_step_content,
-                order=idx + 1,
-                steps=steps
-            )
-        )
-    
-    return Course(
-        title=course_data['course_title'],
-        description=course_data['course_description'],
-        sections=sections
-    ) 
\ No newline at end of file
+    return entry["source_hash"]
+
+
+def get_course_cache_stats() -> dict:
+    """Return hit/miss counters and the number of parsed and listed courses"""
+    return get_catalog().get_stats()
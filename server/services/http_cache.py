@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import threading
+from typing import Callable
+from fastapi import Request, Response
+from fastapi.staticfiles import StaticFiles
+from server.config import settings
+from server.services.serialization import dumps
+
+try:
+    import brotli
+except ImportError:  # brotli opsiyonel; yoksa sadece gzip
+    brotli = None
+
+# name -> (etag, {encoding: body bytes}); her isim için sadece son sürüm tutulur
+_representations = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+def make_etag(*parts: str) -> str:
+    """Strong ETag (without quotes) derived from content hashes."""
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _encode(body: bytes) -> dict:
+    encoded = {"identity": body}
+    if len(body) >= settings.HTTP_COMPRESS_MIN_BYTES:
+        encoded["gzip"] = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            encoded["br"] = brotli.compress(body, quality=5)
+    return encoded
+
+
+def _get_representation(name: str, etag: str, render: Callable[[], bytes]) -> dict:
+    cached = _representations.get(name)
+    if cached and cached[0] == etag:
+        _stats["hits"] += 1
+        return cached[1]
+    encoded = _encode(render())
+    with _lock:
+        _stats["misses"] += 1
+        _representations[name] = (etag, encoded)
+    return encoded
+
+
+def _accepted_encodings(request: Request) -> set:
+    accepted = set()
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        # Sıkıştırılmış temsillerin etiketleri "-gzip"/"-br" ekiyle aynı içeriği gösterir
+        tag = tag.removeprefix("W/").strip('"')
+        if tag.split("-", 1)[0] == etag:
+            return True
+    return False
+
+
+def cached_json_response(request: Request, name: str, etag: str, render: Callable[[], object]) -> Response:
+    """Serve a JSON body with a strong ETag, 304 revalidation and compression.
+
+    `render` is only called when the representation for `etag` is not cached
+    yet; the serialized and compressed bodies are reused until the ETag changes.
+    """
+    headers = {
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE}",
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request, etag):
+        _stats["not_modified"] += 1
+        return Response(status_code=304, headers={**headers, "ETag": f'"{etag}"'})
+
+    encoded = _get_representation(name, etag, lambda: dumps(render()))
+    accepted = _accepted_encodings(request)
+    for encoding in ("br", "gzip"):
+        if encoding in encoded and encoding in accepted:
+            headers["Content-Encoding"] = encoding
+            headers["ETag"] = f'"{etag}-{encoding}"'
+            return Response(encoded[encoding], media_type="application/json", headers=headers)
+
+    headers["ETag"] = f'"{etag}"'
+    return Response(encoded["identity"], media_type="application/json", headers=headers)
+
+
+def get_http_cache_stats() -> dict:
+    return {**_stats, "size": len(_representations)}
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with a Cache-Control header; ETag/304 come from Starlette."""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = f"public, max-age={settings.STATIC_CACHE_MAX_AGE}"
+        return response
@@ -1,20 +1,18 @@
 # File: /server/services/langchain/chat.py
 
-from langchain.agents import AgentExecutor, create_tool_calling_agent
-from langchain.prompts import (
-    ChatPromptTemplate,
-    HumanMessagePromptTemplate,
-    MessagesPlaceholder,
-    SystemMessagePromptTemplate,
-)
-from langchain.schema import SystemMessage
-from server.services.langchain.llms.gemini import build_llm
-from server.services.langchain.memories.memory import build_memory
-from server.models.course import Course
-
-
-def build_prompt(course: Course = None):
-    system_template = """
+import hashlib
+import json
+from server.config import settings
+from server.services.langchain.llms.factory import get_llm
+from server.services.langchain.memories.memory import build_memory, build_messages
+from server.services.langchain.prompt_budget import assemble, estimate_tokens, observe as observe_tokens
+from server.services.langchain.vector_stores.local import retrieve_earlier_steps
+from server.services.metrics import span
+from server.models.course import CourseCursor
+
+# LangChain ağır bir import; sadece model gerçekten gerektiğinde (ilk LLM turunda) yüklenir
+
+SYSTEM_TEMPLATE = """
     Sen bir öğretmen asistanısın. Öğrencilere ders içeriğini adım adım öğretmekle görevlisin.
     
     Görevlerin:
@@ -32,10 +30,14 @@ def build_prompt(course: Course = None):
     {course_info}
     """
 
+
+def build_course_info(cursor: CourseCursor = None) -> str:
+    """Current step context (and related earlier steps) for the system prompt."""
     course_info = ""
-    if course:
-        current_section = course.sections[course.current_section]
-        current_step = current_section.steps[current_section.current_step]
+    if cursor:
+        course = cursor.course
+        current_section = cursor.section
+        current_step = cursor.step
 
         course_info = f"""
         Kurs: {course.title}
@@ -46,33 +48,182 @@ def build_prompt(course: Course = None):
         Beklenen Yanıtlar: {', '.join(current_step.expected_responses) if current_step.expected_responses else 'Serbest yanıt'}
         """
 
-    return ChatPromptTemplate.from_messages(
-        [
-            SystemMessagePromptTemplate.from_template(system_template),
-            MessagesPlaceholder(variable_name="chat_history"),
-            HumanMessagePromptTemplate.from_template("{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ]
-    ).partial(course_info=course_info)
+        related_steps = retrieve_earlier_steps(cursor)
+        if related_steps:
+            course_info += "\n        İlgili önceki adımlar:\n" + "\n".join(
+                f"        - {step.content}" for step in related_steps
+            )
 
+    return course_info
 
-def initialize_chat(conversation_id: str, chat_history: list, course: Course = None):
-    llm = build_llm()
-    memory = build_memory(username=conversation_id, history=chat_history)
-    prompt = build_prompt(course)
 
-    tools = []  # Gerekirse araçlar burada tanımlanabilir
+def build_prompt(cursor: CourseCursor = None, with_scratchpad: bool = False):
+    from langchain_core.prompts import (
+        ChatPromptTemplate,
+        HumanMessagePromptTemplate,
+        MessagesPlaceholder,
+        SystemMessagePromptTemplate,
+    )
+
+    course_info = build_course_info(cursor)
+    messages = [
+        SystemMessagePromptTemplate.from_template(SYSTEM_TEMPLATE),
+        MessagesPlaceholder(variable_name="chat_history"),
+        HumanMessagePromptTemplate.from_template("{input}"),
+    ]
+    if with_scratchpad:
+        # Sadece araç çağıran ajan için gerekli
+        messages.append(MessagesPlaceholder(variable_name="agent_scratchpad"))
+    return ChatPromptTemplate.from_messages(messages).partial(course_info=course_info)
+
+
+TOOLS = []  # Gerekirse araçlar burada tanımlanabilir
+
+# (course_id, section, step, kind) -> (course, value); kind: "chain", "agent", "system_tokens"
+_pipeline_cache = {}
+
+
+def _cached_pipeline(cursor: CourseCursor, kind: str, build):
+    """Entries are tied to the Course object they were built from, so a
+    course reloaded from disk gets fresh templates."""
+    key = (cursor.course_id, cursor.section_index, cursor.step_index, kind) if cursor else (None, kind)
+    course = cursor.course if cursor else None
+    cached = _pipeline_cache.get(key)
+    if cached and cached[0] is course:
+        return cached[1]
+    runnable = build()
+    _pipeline_cache[key] = (course, runnable)
+    return runnable
+
+
+def get_chain(cursor: CourseCursor = None):
+    """Return the cached prompt | model | parser chain for the cursor's step."""
+    def build():
+        from langchain_core.output_parsers import StrOutputParser
+
+        return build_prompt(cursor) | get_llm() | StrOutputParser()
+
+    return _cached_pipeline(cursor, "chain", build)
+
+
+def get_system_tokens(cursor: CourseCursor = None) -> int:
+    """Estimated tokens of the system prompt for the cursor's step."""
+    def build():
+        return estimate_tokens(SYSTEM_TEMPLATE.replace("{course_info}", build_course_info(cursor)))
+
+    return _cached_pipeline(cursor, "system_tokens", build)
+
+
+def get_agent_pipeline(cursor: CourseCursor = None):
+    """Return the cached tool-calling agent for the cursor's step."""
+    def build():
+        from langchain.agents import create_tool_calling_agent
+
+        return create_tool_calling_agent(llm=get_llm(), prompt=build_prompt(cursor, with_scratchpad=True), tools=TOOLS)
 
-    agent = create_tool_calling_agent(llm=llm, prompt=prompt, tools=tools)
+    return _cached_pipeline(cursor, "agent", build)
+
+
+def build_agent_executor(conversation_id: str, chat_history: list, cursor: CourseCursor = None):
+    from langchain.agents import AgentExecutor
+
+    memory = build_memory(username=conversation_id, history=chat_history)
+    agent = get_agent_pipeline(cursor)
 
     agent_executor = AgentExecutor(
         agent=agent,
-        tools=tools,
+        tools=TOOLS,
         memory=memory,
         return_intermediate_steps=True,
-        verbose=True,
+        verbose=settings.LLM_VERBOSE,
         handle_parsing_errors=True,
         max_iterations=1,  # Sonsuz döngüyü engellemek için
     )
 
     return agent_executor
+
+
+def warm_up():
+    """Import LangChain and build the shared model ahead of the first LLM turn."""
+    from langchain_core.output_parsers import StrOutputParser  # noqa: F401
+    from langchain_core.prompts import ChatPromptTemplate  # noqa: F401
+
+    if TOOLS:
+        from langchain.agents import AgentExecutor, create_tool_calling_agent  # noqa: F401
+    get_llm()
+
+
+class TutorChat:
+    """One tutor turn against the model, built lazily.
+
+    Without tools this is a plain prompt | model | parser chain; the
+    AgentExecutor is only used when TOOLS is configured. Turns answered by
+    the expected-response check never build either. The history sent is
+    windowed to LLM_PROMPT_TOKEN_BUDGET.
+    """
+
+    def __init__(self, conversation_id: str, chat_history: list, cursor: CourseCursor = None):
+        self.conversation_id = conversation_id
+        self.chat_history = chat_history
+        self.cursor = cursor
+        self.use_tools = bool(TOOLS)
+        self._runnable = None
+        self._windows = {}  # user input -> assemble() result
+
+    def window(self, inputs: dict) -> dict:
+        """Token-budgeted history for these inputs (see prompt_budget.assemble)."""
+        user_input = inputs.get("input", "")
+        assembled = self._windows.get(user_input)
+        if assembled is None:
+            assembled = assemble(get_system_tokens(self.cursor), user_input, self.chat_history)
+            self._windows[user_input] = assembled
+        return assembled
+
+    def _runnable_for(self, inputs: dict):
+        if self._runnable is None:
+            with span("chat_init"):
+                if self.use_tools:
+                    history = self.window(inputs)["history"]
+                    self._runnable = build_agent_executor(self.conversation_id, history, self.cursor)
+                else:
+                    self._runnable = get_chain(self.cursor)
+        return self._runnable
+
+    def _inputs(self, inputs: dict) -> dict:
+        assembled = self.window(inputs)
+        observe_tokens(assembled)
+        if self.use_tools:
+            return inputs  # geçmiş AgentExecutor belleğinden gelir
+        return {**inputs, "chat_history": build_messages(assembled["history"])}
+
+    def request_key(self, inputs: dict) -> str:
+        """Identify the upstream call: step prompt, history window and inputs."""
+        cursor = self.cursor
+        step_key = (cursor.course_id, cursor.section_index, cursor.step_index) if cursor else None
+        history = self.window(inputs)["history"]
+        payload = json.dumps([step_key, history, inputs], ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def ainvoke(self, inputs: dict, **kwargs) -> dict:
+        """Return {"output": text} (plus intermediate_steps in tool mode)."""
+        runnable = self._runnable_for(inputs)
+        result = await runnable.ainvoke(self._inputs(inputs), **kwargs)
+        return result if self.use_tools else {"output": result}
+
+    async def astream_tokens(self, inputs: dict, **kwargs):
+        """Yield model output text chunks as they are generated."""
+        runnable = self._runnable_for(inputs)
+        if not self.use_tools:
+            async for chunk in runnable.astream(self._inputs(inputs), **kwargs):
+                if chunk:
+                    yield chunk
+            return
+        async for event in runnable.astream_events(self._inputs(inputs), version="v2", **kwargs):
+            if event["event"] == "on_chat_model_stream":
+                content = event["data"]["chunk"].content
+                if content:
+                    yield content
+
+
+def initialize_chat(conversation_id: str, chat_history: list, cursor: CourseCursor = None):
+    return TutorChat(conversation_id, chat_history, cursor)
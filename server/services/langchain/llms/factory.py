@@ -0,0 +1,21 @@
+from functools import lru_cache
+from server.config import settings
+
+
+def build_llm():
+    """Build the chat model selected by LLM_BACKEND ("gemini" or "fake")."""
+    if settings.LLM_BACKEND == "fake":
+        from server.services.langchain.llms.fake import build_llm as build_fake_llm
+
+        return build_fake_llm()
+    if settings.LLM_BACKEND == "gemini":
+        from server.services.langchain.llms.gemini import build_llm as build_gemini_llm
+
+        return build_gemini_llm()
+    raise ValueError(f"Unknown LLM_BACKEND: {settings.LLM_BACKEND}")
+
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """Process-wide chat model, shared by every request."""
+    return build_llm()
@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from server.config import settings
+
+REPLIES = [
+    "DEĞERLENDİRME: Yanlış\nAÇIKLAMA: Güzel bir deneme, ama tam olarak beklenen cevap bu değil. Konuyu bir kez daha düşünelim.\nDEVAM: Soruyu tekrar okuyup bir cevap daha verebilir misin?",
+    "DEĞERLENDİRME: Doğru\nAÇIKLAMA: Harika! Bu cevap konunun özünü yakalıyor ve doğru düşündüğünü gösteriyor.\nDEVAM: Bir sonraki adıma geçmeye hazırız.",
+    "DEĞERLENDİRME: Yanlış\nAÇIKLAMA: Bu konuda kafa karışıklığı çok normal. Bir ipucu: ders içeriğindeki anahtar kelimelere tekrar göz at.\nDEVAM: Hazır olduğunda yeniden dene.",
+]
+
+
+class FakeTutorLLM(BaseChatModel):
+    """Deterministic offline stand-in for Gemini.
+
+    The reply depends only on the last message, and its timing is simulated
+    with `latency` (seconds before the first token) and `tokens_per_second`.
+    """
+
+    latency: float = 0.2
+    tokens_per_second: float = 50.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-tutor"
+
+    def bind_tools(self, tools, **kwargs):
+        # Araç çağrısı yapılmaz; create_tool_calling_agent ile uyum için
+        return self
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        last = messages[-1].content if messages else ""
+        digest = hashlib.sha256(str(last).encode("utf-8")).digest()
+        reply = REPLIES[digest[0] % len(REPLIES)]
+        words = reply.split(" ")
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.latency + len(tokens) * self._token_delay())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency + len(tokens) * self._token_delay())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens(messages):
+            time.sleep(self._token_delay())
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(messages):
+            await asyncio.sleep(self._token_delay())
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def build_llm():
+    return FakeTutorLLM(
+        latency=settings.FAKE_LLM_LATENCY_MS / 1000,
+        tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+    )
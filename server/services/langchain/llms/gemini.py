@@ -9,7 +9,5 @@ def build_llm():
         top_p=0.8,
         top_k=40,
         max_output_tokens=2048,
-        verbose=True
+        verbose=settings.LLM_VERBOSE,
     )
-
-build_llm()
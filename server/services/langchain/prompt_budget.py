@@ -0,0 +1,60 @@
+import math
+import re
+from functools import lru_cache
+from server.config import settings
+from server.services.metrics import LLM_PROMPT_TOKENS
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+# Mesaj başına rol/ayraç ek yükü (yaklaşık)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=settings.LLM_TOKEN_CACHE_SIZE)
+def estimate_tokens(text: str) -> int:
+    """Offline token estimate: ~4 characters per sub-word piece.
+
+    Cached per text, so history messages are only measured once while they
+    stay in the window. It errs on the high side for Turkish text.
+    """
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _PIECE_RE.findall(text))
+
+
+def window_history(history: list, budget: int) -> tuple:
+    """Keep the most recent messages that fit in `budget` tokens.
+
+    Returns (messages, tokens used). Message order is preserved.
+    """
+    kept, used = [], 0
+    for message in reversed(history):
+        tokens = estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+        if used + tokens > budget:
+            break
+        kept.append(message)
+        used += tokens
+    kept.reverse()
+    return kept, used
+
+
+def assemble(system_tokens: int, user_input: str, history: list, budget: int = None) -> dict:
+    """Fit a turn into the prompt token budget.
+
+    The system prompt (with the current step context) and the user input are
+    always sent; the most recent history turns fill what is left.
+    """
+    budget = settings.LLM_PROMPT_TOKEN_BUDGET if budget is None else budget
+    input_tokens = estimate_tokens(user_input) + MESSAGE_OVERHEAD_TOKENS
+    messages, history_tokens = window_history(history, max(0, budget - system_tokens - input_tokens))
+    return {
+        "history": messages,
+        "dropped_messages": len(history) - len(messages),
+        "system_tokens": system_tokens,
+        "history_tokens": history_tokens,
+        "input_tokens": input_tokens,
+        "total_tokens": system_tokens + history_tokens + input_tokens,
+    }
+
+
+def observe(assembled: dict):
+    """Record the tokens sent for one turn."""
+    for part in ("system", "history", "input", "total"):
+        LLM_PROMPT_TOKENS.labels(part=part).observe(assembled[f"{part}_tokens"])
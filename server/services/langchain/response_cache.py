@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+from server.config import settings
+from server.models.course import CourseCursor
+from server.services.answer_matcher import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """LLM reply cache keyed by (course_id, section, step, normalized input).
+
+    The in-process tier is an LRU with per-entry TTL. When a Mongo collection
+    is given it is used as a shared second tier, so workers reuse each
+    other's replies; expiry there is handled by a TTL index on expires_at.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int, collection=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.collection = collection
+        self._entries = OrderedDict()  # key -> (expires_at, output)
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def make_key(cursor: CourseCursor, user_input: str) -> str:
+        raw = f"{cursor.course_id}\x1f{cursor.section_index}\x1f{cursor.step_index}\x1f{normalize_text(user_input)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def is_enabled_for(self, cursor: CourseCursor) -> bool:
+        return settings.LLM_CACHE_ENABLED and cursor is not None and cursor.course.llm_cache
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            del self._entries[key]
+
+        if self.collection is not None:
+            try:
+                document = await self.collection.find_one(
+                    {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}, {"output": 1}
+                )
+            except Exception as e:
+                logger.error(f"Error reading shared response cache: {str(e)}")
+                document = None
+            if document:
+                self._store_local(key, document["output"])
+                self.stats["shared_hits"] += 1
+                return document["output"]
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, output: str):
+        if not output:
+            return
+        self._store_local(key, output)
+        self.stats["stores"] += 1
+
+        if self.collection is not None:
+            try:
+                await self.collection.update_one(
+                    {"_id": key},
+                    {
+                        "$set": {
+                            "output": output,
+                            "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+                        }
+                    },
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.error(f"Error writing shared response cache: {str(e)}")
+
+    def _store_local(self, key: str, output: str):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, output)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["shared_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["shared_hits"]) / lookups if lookups else 0.0
+        return {**self.stats, "size": len(self._entries), "hit_rate": hit_rate}
+
+    def clear(self):
+        self._entries.clear()
+
+
+def build_response_cache() -> ResponseCache:
+    collection = None
+    if settings.LLM_CACHE_MONGO:
+        from server import database
+
+        collection = database.collection(settings.LLM_CACHE_COLLECTION)
+    return ResponseCache(
+        max_size=settings.LLM_CACHE_MAX_SIZE,
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        collection=collection,
+    )
+
+
+response_cache = build_response_cache()
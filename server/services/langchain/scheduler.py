@@ -0,0 +1,177 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from server.config import settings
+from server.services.metrics import LLM_QUEUE_WAIT_SECONDS
+
+PRIORITY_HIGH = 0  # ilk tur veya kısa girdi
+PRIORITY_NORMAL = 1
+
+
+class LLMOverloaded(Exception):
+    """Raised when an LLM call is shed; carries a Retry-After hint in seconds."""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(f"LLM overloaded ({reason}), retry after {retry_after}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Detect upstream 429 / quota errors from the model SDK.
+
+    Only the status attributes and exception types are checked (also on the
+    wrapped cause); the message text is not, since it may contain any number.
+    """
+    while error is not None:
+        if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+            return True
+        if type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "RateLimitError"):
+            return True
+        error = error.__cause__
+    return False
+
+
+class LLMScheduler:
+    """Admission control for LLM calls.
+
+    At most `max_concurrency` calls run at once; others wait in a bounded
+    priority queue ordered by (priority, the user's outstanding calls,
+    arrival). A request is shed with LLMOverloaded when the queue is full,
+    when its estimated wait exceeds its deadline, or when the deadline
+    passes while it is queued.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, deadline_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.deadline_seconds = deadline_seconds
+        self.service_time = 1.0  # saniye, üstel hareketli ortalama
+        self._active = 0
+        self._queue = []  # heap of [priority, user_load, seq, user_id, future]
+        self._user_load = Counter()
+        self._seq = itertools.count()
+        self.stats = {"admitted": 0, "queued": 0, "shed": 0}
+
+    @staticmethod
+    def priority_for(user_input: str, first_turn: bool) -> int:
+        if first_turn or len(user_input) <= settings.LLM_SHORT_INPUT_CHARS:
+            return PRIORITY_HIGH
+        return PRIORITY_NORMAL
+
+    def estimated_wait(self, position: int) -> float:
+        """Expected seconds until the request at queue `position` (1-based) starts."""
+        return math.ceil(position / self.max_concurrency) * self.service_time
+
+    def _shed(self, reason: str, position: int):
+        self.stats["shed"] += 1
+        raise LLMOverloaded(max(1, math.ceil(self.estimated_wait(position))), reason)
+
+    def check_admission(self, deadline: float = None):
+        """Fail fast if a new request would be shed right now."""
+        deadline = self.deadline_seconds if deadline is None else deadline
+        if self._active < self.max_concurrency and not self._queue:
+            return
+        if len(self._queue) >= self.max_queue:
+            self._shed("queue_full", len(self._queue) + 1)
+        if self.estimated_wait(len(self._queue) + 1) > deadline:
+            self._shed("deadline", len(self._queue) + 1)
+
+    async def _acquire(self, user_id: str, priority: int, deadline: float):
+        self.check_admission(deadline)
+        if self._active < self.max_concurrency and not self._queue:
+            self._active += 1
+            self.stats["admitted"] += 1
+            LLM_QUEUE_WAIT_SECONDS.labels(priority=str(priority)).observe(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        # Kullanıcının diğer bekleyen/çalışan çağrıları sırada geriye iter
+        entry = [priority, self._user_load[user_id] - 1, next(self._seq), user_id, future]
+        heapq.heappush(self._queue, entry)
+        self.stats["queued"] += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, timeout=deadline)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            granted = future.done() and not future.cancelled()
+            if not granted:
+                self._remove(entry)
+                if isinstance(e, asyncio.TimeoutError):
+                    self._shed("deadline", len(self._queue) + 1)
+                raise
+            if isinstance(e, asyncio.CancelledError):
+                # Slot verildikten hemen sonra iptal edildi; slotu geri ver
+                self._release()
+                raise
+        self.stats["admitted"] += 1
+        LLM_QUEUE_WAIT_SECONDS.labels(priority=str(priority)).observe(time.perf_counter() - started)
+
+    def _remove(self, entry):
+        try:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+        except ValueError:
+            pass
+
+    def _release(self):
+        # Slot sıradaki canlı bekleyene devredilir, yoksa boşaltılır
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            future = entry[4]
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, priority: int = PRIORITY_NORMAL, deadline: float = None):
+        deadline = self.deadline_seconds if deadline is None else deadline
+        self._user_load[user_id] += 1
+        try:
+            await self._acquire(user_id, priority, deadline)
+        except BaseException:
+            self._done(user_id)
+            raise
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.service_time = 0.8 * self.service_time + 0.2 * (time.perf_counter() - started)
+            self._done(user_id)
+            self._release()
+
+    def _done(self, user_id: str):
+        self._user_load[user_id] -= 1
+        if self._user_load[user_id] <= 0:
+            del self._user_load[user_id]
+
+    async def run(self, user_id: str, priority: int, fn, deadline: float = None):
+        async with self.slot(user_id, priority, deadline):
+            try:
+                return await fn()
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    self.stats["shed"] += 1
+                    raise LLMOverloaded(settings.LLM_RETRY_AFTER_SECONDS, "upstream_rate_limited") from e
+                raise
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "active": self._active,
+            "queue_depth": len(self._queue),
+            "service_time_seconds": self.service_time,
+        }
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_queue=settings.LLM_MAX_QUEUE,
+    deadline_seconds=settings.LLM_QUEUE_DEADLINE_SECONDS,
+)
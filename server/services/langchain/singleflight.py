@@ -0,0 +1,59 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce identical in-flight async calls into one upstream call.
+
+    The first caller for a key starts the call; callers arriving while it is
+    running await the same task and get the same result or exception, in
+    arrival order. A cancelled caller only detaches itself; the upstream
+    call is cancelled once no caller is left waiting for it. Keys are
+    forgotten as soon as the call finishes, so results are never reused
+    afterwards (that is the response cache's job).
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.stats = {"calls": 0, "coalesced": 0, "cancelled": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        flight = self._flights.get(key)
+        # İptal edilmekte olan bir çağrıya yeni bekleyen eklenmez
+        if flight is None or flight.task.cancelling():
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._forget(key, flight))
+            self.stats["calls"] += 1
+        else:
+            self.stats["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Bekleyen kimse kalmadı; üst akıştaki çağrı da iptal edilir
+                flight.task.cancel()
+                self.stats["cancelled"] += 1
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "in_flight": len(self._flights)}
+
+
+llm_singleflight = SingleFlight()
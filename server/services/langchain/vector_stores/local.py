@@ -0,0 +1,186 @@
+import hashlib
+import importlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import List
+import numpy as np
+from server.config import settings
+from server.models.course import CourseCursor
+from server.services.answer_matcher import normalize_tokens
+from server.services.course_catalog import resolve_path
+from server.services.course_loader import get_course_hash, list_course_ids, load_course_content
+
+logger = logging.getLogger(__name__)
+
+
+def _atomic_write(path: str, mode: str, write):
+    """Write through a uniquely named temp file, then atomically replace `path`.
+
+    Several workers may build the same index at once; each writes its own
+    temp file, so a reader never sees a partially written file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as file:
+            write(file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class HashingEmbedder:
+    """Offline embedder: signed feature hashing of word unigrams and bigrams.
+
+    Any object with `name`, `dimension` and `embed(texts) -> ndarray` can be
+    used instead (see VECTOR_EMBEDDER).
+    """
+
+    def __init__(self, dimension: int = 512):
+        self.dimension = dimension
+        self.name = f"hashing-{dimension}"
+
+    def _features(self, text: str) -> List[str]:
+        tokens = normalize_tokens(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                vectors[row, value % self.dimension] += 1.0 if value >> 63 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def build_embedder():
+    """Resolve VECTOR_EMBEDDER: "hashing" or a "module:factory" path."""
+    if settings.VECTOR_EMBEDDER == "hashing":
+        return HashingEmbedder(settings.VECTOR_DIMENSION)
+    module_name, _, attribute = settings.VECTOR_EMBEDDER.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+class LocalVectorStore:
+    """Per-course step embeddings kept as memory-mapped .npy files.
+
+    Each course has `<course_id>.npy` (one L2-normalized row per step, in
+    course order) and `<course_id>.json` (source hash, embedder and step
+    positions). Only courses whose YAML hash or embedder changed are
+    re-embedded.
+    """
+
+    def __init__(self, index_dir: str, embedder):
+        self.index_dir = index_dir
+        self.embedder = embedder
+        self._indexes = {}  # course_id -> (source_hash, matrix, positions)
+        self._lock = threading.Lock()
+
+    def _paths(self, course_id: str):
+        base = os.path.join(self.index_dir, course_id)
+        return f"{base}.npy", f"{base}.json"
+
+    def sync(self, course_ids: List[str] = None) -> dict:
+        """Load or rebuild the index of each course; returns course_id -> "loaded"/"built"."""
+        results = {}
+        for course_id in course_ids if course_ids is not None else list_course_ids():
+            try:
+                results[course_id] = self._ensure(course_id)
+            except Exception as e:
+                logger.error(f"Error indexing course {course_id}: {str(e)}")
+        return results
+
+    def _ensure(self, course_id: str) -> str:
+        source_hash = get_course_hash(course_id)
+        current = self._indexes.get(course_id)
+        if current and current[0] == source_hash:
+            return "cached"
+
+        with self._lock:
+            matrix_path, meta_path = self._paths(course_id)
+            try:
+                with open(meta_path, "r", encoding="utf-8") as file:
+                    meta = json.load(file)
+                if meta["source_hash"] == source_hash and meta["embedder"] == self.embedder.name:
+                    matrix = np.load(matrix_path, mmap_mode="r")
+                    self._indexes[course_id] = (source_hash, matrix, [tuple(p) for p in meta["positions"]])
+                    return "loaded"
+            except (FileNotFoundError, KeyError, ValueError):
+                pass
+
+            self._build(course_id, source_hash)
+            return "built"
+
+    def _build(self, course_id: str, source_hash: str):
+        course = load_course_content(course_id)
+        positions, texts = [], []
+        for section_index, section in enumerate(course.sections):
+            for step_index, step in enumerate(section.steps):
+                positions.append((section_index, step_index))
+                texts.append(f"{section.title}\n{step.content}")
+
+        matrix = self.embedder.embed(texts) if texts else np.zeros((0, self.embedder.dimension), np.float32)
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        matrix_path, meta_path = self._paths(course_id)
+        _atomic_write(matrix_path, "wb", lambda file: np.save(file, matrix))
+        _atomic_write(
+            meta_path,
+            "w",
+            lambda file: json.dump(
+                {"source_hash": source_hash, "embedder": self.embedder.name, "positions": positions},
+                file,
+            ),
+        )
+
+        self._indexes[course_id] = (source_hash, np.load(matrix_path, mmap_mode="r"), positions)
+        logger.info(f"Built vector index for {course_id} ({len(positions)} steps)")
+
+    def search(self, course_id: str, queries: List[str], k: int = 3, limit: int = None):
+        """Batched top-k cosine search over a course's steps.
+
+        Only the first `limit` steps (in course order) are candidates.
+        Returns one list of (score, (section_index, step_index)) per query.
+        """
+        self._ensure(course_id)
+        _, matrix, positions = self._indexes[course_id]
+        candidates = len(positions) if limit is None else max(0, min(limit, len(positions)))
+        if not queries or candidates == 0:
+            return [[] for _ in queries]
+
+        scores = self.embedder.embed(queries) @ np.asarray(matrix[:candidates]).T
+        k = min(k, candidates)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, indices in enumerate(top):
+            ranked = sorted(indices, key=lambda i: -scores[row, i])
+            results.append([(float(scores[row, i]), positions[i]) for i in ranked])
+        return results
+
+
+def retrieve_earlier_steps(cursor: CourseCursor, k: int = None) -> list:
+    """Return up to k earlier steps of the course most similar to the current one."""
+    if not settings.VECTOR_INDEX_ENABLED or cursor is None or cursor.step_index < 0:
+        return []
+    k = k or settings.VECTOR_TOP_K
+    course = cursor.course
+    ordinal = course.step_index.ordinal(cursor.section_index, cursor.step_index)
+    try:
+        (matches,) = vector_store.search(cursor.course_id, [cursor.step.content], k=k, limit=ordinal)
+    except Exception as e:
+        logger.error(f"Error retrieving related steps: {str(e)}")
+        return []
+    return [
+        course.sections[section_index].steps[step_index]
+        for score, (section_index, step_index) in matches
+        if score >= settings.VECTOR_MIN_SCORE
+    ]
+
+
+# Göreli yol çalışma dizinine değil proje köküne göre çözülür
+vector_store = LocalVectorStore(str(resolve_path(settings.VECTOR_INDEX_DIR)), build_embedder())
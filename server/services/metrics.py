@@ -0,0 +1,142 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+from prometheus_client import Histogram
+from prometheus_client.core import REGISTRY, GaugeMetricFamily
+
+STAGE_SECONDS = Histogram(
+    "neyapai_stage_seconds",
+    "Time spent in each stage of a request pipeline",
+    ["endpoint", "stage", "course", "path"],
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "neyapai_llm_queue_wait_seconds",
+    "Time LLM calls waited for an admission slot",
+    ["priority"],
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "neyapai_llm_prompt_tokens",
+    "Estimated prompt tokens sent to the LLM per turn",
+    ["part"],
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384),
+)
+WRITE_BEHIND_BATCH_SIZE = Histogram(
+    "neyapai_write_behind_batch_size",
+    "Operations per write-behind bulk_write flush",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+WRITE_BEHIND_FLUSH_SECONDS = Histogram(
+    "neyapai_write_behind_flush_seconds",
+    "Time to flush one write-behind batch",
+)
+REQUEST_SECONDS = Histogram(
+    "neyapai_request_seconds",
+    "End-to-end request time of instrumented endpoints",
+    ["endpoint", "course", "path"],
+)
+
+
+class RequestTiming:
+    """Spans and labels collected while one request is handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []  # (stage, seconds)
+        self.labels = {"endpoint": "", "course": "", "path": ""}
+
+    def server_timing_header(self) -> str:
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.spans)
+
+    def observe(self):
+        # Sadece etiketlenen (enstrümante edilmiş) uç noktalar ölçülür
+        if not self.labels["endpoint"]:
+            return
+        for stage, seconds in self.spans:
+            STAGE_SECONDS.labels(stage=stage, **self.labels).observe(seconds)
+        REQUEST_SECONDS.labels(**self.labels).observe(time.perf_counter() - self.started)
+
+
+_current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block as a named stage of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.spans.append((stage, time.perf_counter() - started))
+
+
+def set_labels(**labels):
+    """Set endpoint/course/path labels for the current request."""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.labels.update({key: str(value) for key, value in labels.items()})
+
+
+@contextmanager
+def request_timing():
+    """Collect spans for work outside an HTTP request, e.g. one WebSocket turn."""
+    timing = RequestTiming()
+    token = _current_timing.set(timing)
+    try:
+        yield timing
+    finally:
+        timing.observe()
+        _current_timing.reset(token)
+
+
+class TimingMiddleware:
+    """ASGI middleware: collects spans, adds Server-Timing and records histograms."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and timing.spans:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.server_timing_header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # Akış yanıtlarında gövde bittikten sonra gözlemlenir
+            timing.observe()
+            _current_timing.reset(token)
+
+
+# name -> callable returning {stat: number}
+_stats_providers: Dict[str, Callable[[], dict]] = {}
+
+
+def register_stats(name: str, provider: Callable[[], dict]):
+    """Expose a component's counters as neyapai_<name>{stat=...} gauges."""
+    _stats_providers[name] = provider
+
+
+class _StatsCollector:
+    def collect(self):
+        for name, provider in _stats_providers.items():
+            family = GaugeMetricFamily(f"neyapai_{name}", f"{name} counters", labels=["stat"])
+            for stat, value in provider().items():
+                if isinstance(value, (int, float)):
+                    family.add_metric([stat], float(value))
+            yield family
+
+
+REGISTRY.register(_StatsCollector())
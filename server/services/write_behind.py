@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from server import database
+from server.config import settings
+from server.services.metrics import WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class StaleWrite(Exception):
+    """The user's course state already has a newer pending update."""
+
+
+class WriteBehindBuffer:
+    """In-process buffer that flushes turn writes as ordered bulk_write batches.
+
+    Writes are flushed every `interval` seconds or as soon as `max_batch`
+    operations are pending. Batches are ordered, so each user's writes hit
+    Mongo in the order they were queued. Readers call `flush_user` first to
+    see their own pending writes.
+
+    An operation Mongo rejects (a BulkWriteError write error) is skipped.
+    On any other error (write concern, network, failover, timeout) the
+    unwritten operations go back to the front of the queue and are retried
+    with exponential backoff up to `max_backoff` seconds. Delivery is at
+    least once.
+    """
+
+    def __init__(self, max_batch: int, interval: float, max_backoff: float):
+        self.max_batch = max_batch
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._pending = []  # (collection_name, user_id, operation)
+        self._user_ops = Counter()  # user_id -> queued or in-flight operations
+        self._versions = {}  # user_id -> course-state version after pending updates
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._size_flush = None
+        self.stats = {"queued": 0, "flushed": 0, "batches": 0, "errors": 0, "stale": 0, "requeued": 0}
+
+    def claim_version(self, user_id: str, version: int):
+        """Reserve the next course-state version for a guarded update.
+
+        Raises StaleWrite if another turn of the user already queued an
+        update based on this (or a later) version.
+        """
+        expected = self._versions.get(user_id)
+        if expected is not None and version < expected:
+            self.stats["stale"] += 1
+            raise StaleWrite(user_id)
+        self._versions[user_id] = version + 1
+
+    def enqueue(self, collection_name: str, user_id: str, operation):
+        self._ensure_running()
+        self._pending.append((collection_name, user_id, operation))
+        self._user_ops[user_id] += 1
+        self.stats["queued"] += 1
+        if len(self._pending) >= self.max_batch and (self._size_flush is None or self._size_flush.done()):
+            self._size_flush = asyncio.ensure_future(self._flush_logged())
+
+    async def flush_user(self, user_id: str):
+        """Read-your-writes: wait until the user's pending writes are in Mongo.
+
+        Retries with backoff while Mongo is unavailable and re-raises the
+        error once the backoff exceeds max_backoff.
+        """
+        delay = self.interval
+        while self._user_ops.get(user_id):
+            try:
+                await self.flush()
+            except Exception:
+                if delay > self.max_backoff:
+                    raise
+                await asyncio.sleep(delay)
+                delay *= 2
+                continue
+            # Başarılı flush'tan sonra kuyrukta kullanıcının işlemi kalmadıysa sayaç kaymıştır;
+            # beklemeye devam etmek olay döngüsünü kilitler
+            if self._user_ops.get(user_id) and not any(entry[1] == user_id for entry in self._pending):
+                logger.error(f"Write-behind: no pending ops left for {user_id}, resetting its counter")
+                self._forget_user(user_id)
+
+    def _forget_user(self, user_id: str):
+        self._user_ops.pop(user_id, None)
+        self._versions.pop(user_id, None)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            started = time.perf_counter()
+
+            by_collection = {}
+            for entry in batch:
+                by_collection.setdefault(entry[0], []).append(entry)
+            results = await asyncio.gather(
+                *(self._write(name, entries) for name, entries in by_collection.items()),
+                return_exceptions=True,
+            )
+            # Beklenmeyen bir hata da işlemleri kaybettirmez; koleksiyonun tamamı yeniden denenir
+            results = [
+                (entries, result) if isinstance(result, BaseException) else result
+                for entries, result in zip(by_collection.values(), results)
+            ]
+
+            unwritten = [entry for entries, _ in results for entry in entries]
+            unwritten_ids = {id(entry) for entry in unwritten}
+            for entry in batch:
+                if id(entry) in unwritten_ids:
+                    continue
+                user_id = entry[1]
+                self._user_ops[user_id] -= 1
+                if self._user_ops[user_id] <= 0:
+                    self._forget_user(user_id)
+
+            WRITE_BEHIND_BATCH_SIZE.observe(len(batch))
+            WRITE_BEHIND_FLUSH_SECONDS.observe(time.perf_counter() - started)
+            self.stats["batches"] += 1
+            self.stats["flushed"] += len(batch) - len(unwritten)
+            if unwritten:
+                # Yazılamayanlar sıralarını koruyarak kuyruğun başına döner
+                self._pending[:0] = unwritten
+                self.stats["requeued"] += len(unwritten)
+                raise next(error for _, error in results if error is not None)
+
+    async def _write(self, collection_name: str, entries: list):
+        """Write entries in order; returns (entries left unwritten, error)."""
+        from pymongo.errors import BulkWriteError
+
+        while entries:
+            try:
+                collection = database.collection(collection_name)
+                await collection.bulk_write([operation for _, _, operation in entries], ordered=True)
+                return [], None
+            except BulkWriteError as e:
+                write_errors = (e.details or {}).get("writeErrors") or []
+                if not write_errors or "index" not in write_errors[0]:
+                    # writeConcernErrors (işlem reddedilmedi, onay alınamadı) ya da tanınmayan ayrıntı: geçici hata sayılır
+                    logger.error(f"Write-behind bulk write not acknowledged on {collection_name}, {len(entries)} ops requeued: {str(e)}")
+                    return entries, e
+                # Sıralı yazımda hata sonrası işlemler uygulanmaz; hatalı işlem atlanıp kalanı yeniden denenir
+                failed = write_errors[0]["index"]
+                self.stats["errors"] += 1
+                logger.error(f"Write-behind op failed on {collection_name}: {write_errors[0].get('errmsg')}")
+                entries = entries[failed + 1:]
+            except Exception as e:
+                # Geçici hata (ağ, failover, zaman aşımı): işlemler kaybolmaz, yeniden denenir
+                logger.error(f"Write-behind flush failed on {collection_name}, {len(entries)} ops requeued: {str(e)}")
+                return entries, e
+        return [], None
+
+    async def _flush_logged(self) -> bool:
+        try:
+            await self.flush()
+            return True
+        except Exception as e:
+            logger.error(f"Write-behind flush error: {str(e)}")
+            return False
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        delay = self.interval
+        while True:
+            await asyncio.sleep(delay)
+            # Başarısız denemeden sonra bekleme süresi katlanarak artar
+            delay = self.interval if await self._flush_logged() else min(delay * 2, self.max_backoff)
+
+    async def stop(self):
+        """Stop the interval task and flush what is left (lifespan shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        delay = self.interval
+        while not await self._flush_logged():
+            if delay > self.max_backoff:
+                logger.error(f"Write-behind shutdown: {len(self._pending)} ops could not be written")
+                return
+            await asyncio.sleep(delay)
+            delay *= 2
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "pending": len(self._pending), "users_pending": len(self._user_ops)}
+
+
+write_behind = WriteBehindBuffer(
+    max_batch=settings.WRITE_BEHIND_MAX_BATCH,
+    interval=settings.WRITE_BEHIND_FLUSH_MS / 1000,
+    max_backoff=settings.WRITE_BEHIND_MAX_BACKOFF_SECONDS,
+)
@@ -0,0 +1,136 @@
+"""HTTP access to the NeYapAI API for the Streamlit UI.
+
+One pooled keep-alive session is shared by every rerun. The course catalog
+and course content are cached with st.cache_data and, once the TTL expires,
+revalidated with If-None-Match, so an unchanged course costs a 304.
+"""
+import json
+import os
+import threading
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
+CATALOG_TTL_SECONDS = int(os.getenv("UI_CATALOG_TTL_SECONDS", "60"))
+REQUEST_TIMEOUT = (3.05, 30)  # (bağlantı, okuma) saniye
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Process-wide session; connections are kept alive and reused."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_resource
+def _validators() -> dict:
+    # url -> (etag, body); TTL dolduktan sonra koşullu istek için saklanır
+    return {}
+
+
+def get_json_revalidated(path: str):
+    """GET a JSON resource, answering from the stored copy on 304."""
+    url = f"{API_BASE_URL}{path}"
+    validators = _validators()
+    cached = validators.get(url)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+
+    response = get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304 and cached:
+        return cached[1]
+    response.raise_for_status()
+    body = response.json()
+    etag = response.headers.get("ETag")
+    if etag:
+        validators[url] = (etag, body)
+    return body
+
+
+@st.cache_data(ttl=CATALOG_TTL_SECONDS, show_spinner=False)
+def get_available_courses() -> list:
+    return get_json_revalidated("/llm/available-courses")
+
+
+@st.cache_data(ttl=CATALOG_TTL_SECONDS, show_spinner=False)
+def get_course_content(course_id: str) -> dict:
+    return get_json_revalidated(f"/llm/course-content/{course_id}")
+
+
+def get_progress(user_id: str = "default_user") -> dict:
+    # Her turda değişir; önbelleğe alınmaz
+    response = get_session().get(f"{API_BASE_URL}/llm/progress/{user_id}", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def start_course(course_id: str, user_id: str = "default_user") -> dict:
+    response = get_session().post(
+        f"{API_BASE_URL}/llm/start-course/{course_id}", params={"user_id": user_id}, timeout=REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def stream_completion(prompt: str, user_id: str = "default_user"):
+    """Yield reply tokens from the SSE completions endpoint"""
+    with get_session().post(
+        f"{API_BASE_URL}/llm/completions/stream",
+        json={"input": prompt},
+        params={"user_id": user_id},
+        stream=True,
+        timeout=REQUEST_TIMEOUT,
+    ) as response:
+        response.raise_for_status()
+        response.encoding = "utf-8"
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                event = "message"
+            elif line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:"):])
+                if event == "token":
+                    yield data["token"]
+                elif event == "error":
+                    raise RuntimeError(data.get("detail", "Yanıt alınamadı"))
+
+
+def fetch_concurrently(**calls):
+    """Run zero-argument callables in parallel threads; returns name -> result.
+
+    A failed call's exception is returned in place of its result.
+    """
+    results = {}
+    context = get_script_run_ctx()
+
+    def run(name, call):
+        try:
+            results[name] = call()
+        except Exception as e:
+            results[name] = e
+
+    threads = []
+    for name, call in calls.items():
+        thread = threading.Thread(target=run, args=(name, call), daemon=True)
+        # st.cache_data'nın iş parçacığında da çalışması için betik bağlamı aktarılır
+        add_script_run_ctx(thread, context)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def fetch_sidebar_data(course_id: str, user_id: str = "default_user") -> dict:
+    """Progress (always fresh) and course content (cached) fetched concurrently."""
+    return fetch_concurrently(
+        progress=lambda: get_progress(user_id),
+        course=lambda: get_course_content(course_id),
+    )
@@ -0,0 +1,109 @@
+"""Chat rendering for the Streamlit UI.
+
+Messages are split into text and image fragments once, keyed by message
+id, and image files are read once per process. Only the last
+UI_VISIBLE_MESSAGES messages are drawn unless the user expands the history,
+so a rerun costs about the same in a long session as in a short one.
+"""
+import io
+import os
+import re
+import uuid
+from pathlib import Path
+
+import streamlit as st
+
+ROOT_DIR = Path(__file__).parent.parent
+VISIBLE_MESSAGES = int(os.getenv("UI_VISIBLE_MESSAGES", "20"))
+# Streamlit daha geniş resimleri her çizimde yeniden boyutlandırıp kodlar
+MAX_IMAGE_WIDTH = 1460
+
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\(/images/([^)]+)\)")
+
+
+def new_message(role: str, content: str, **fields) -> dict:
+    """Chat message with a stable id for the fragment cache."""
+    return {"id": uuid.uuid4().hex, "role": role, "content": content, **fields}
+
+
+def ensure_id(message: dict) -> dict:
+    # API'den gelen mesajların id'si yoktur
+    message.setdefault("id", uuid.uuid4().hex)
+    return message
+
+
+def parse_fragments(content: str) -> tuple:
+    """Split markdown into ("text", markdown) and ("image", file, caption) fragments."""
+    fragments = []
+    position = 0
+    for match in _IMAGE_RE.finditer(content):
+        text = content[position:match.start()]
+        if text.strip():
+            fragments.append(("text", text))
+        fragments.append(("image", match.group(2), match.group(1)))
+        position = match.end()
+    text = content[position:]
+    if text.strip() or not fragments:
+        fragments.append(("text", text))
+    return tuple(fragments)
+
+
+def message_fragments(message: dict) -> tuple:
+    # Mesaj başına bir kez ayrıştırılır; oturum boyunca saklanır
+    cache = st.session_state.setdefault("message_fragments", {})
+    message_id = ensure_id(message)["id"]
+    fragments = cache.get(message_id)
+    if fragments is None:
+        fragments = cache[message_id] = parse_fragments(message["content"])
+    return fragments
+
+
+@st.cache_resource(show_spinner=False)
+def load_image(name: str):
+    """Image bytes from the images directory, read once per process; None if unreadable.
+
+    Images wider than the content area are downscaled here, once, so
+    st.image can serve the bytes as they are on every rerun.
+    """
+    from PIL import Image
+
+    images_dir = (ROOT_DIR / "images").resolve()
+    path = (images_dir / name).resolve()
+    if not path.is_relative_to(images_dir):
+        return None
+    try:
+        data = path.read_bytes()
+        image = Image.open(io.BytesIO(data))
+        if image.width <= MAX_IMAGE_WIDTH:
+            return data
+        height = int(image.height * MAX_IMAGE_WIDTH / image.width)
+        output = io.BytesIO()
+        image.resize((MAX_IMAGE_WIDTH, height), resample=Image.BILINEAR).save(output, format=image.format)
+        return output.getvalue()
+    except OSError:
+        return None
+
+
+def render_message(message: dict):
+    with st.chat_message(message["role"]):
+        for fragment in message_fragments(message):
+            if fragment[0] == "text":
+                st.markdown(fragment[1])
+                continue
+            _, name, caption = fragment
+            image = load_image(name)
+            if image is None:
+                st.error(f"Resim yüklenirken hata oluştu: {name}")
+            else:
+                st.image(image, caption=caption)
+
+
+def render_history(messages: list, visible: int = VISIBLE_MESSAGES):
+    """Draw the last `visible` messages; older ones only when expanded."""
+    hidden = max(0, len(messages) - visible)
+    if hidden and st.toggle(f"Önceki {hidden} mesajı göster", key="show_older_messages"):
+        visible_messages = messages
+    else:
+        visible_messages = messages[hidden:]
+    for message in visible_messages:
+        render_message(message)